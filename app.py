@@ -1,41 +1,131 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
 import datetime
-import requests
 import unicodedata
+import math
 import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
 import logging
-load_dotenv()
-
-app = Flask(__name__)
-CORS(app)
+import click
+from collections import namedtuple
+from fractions import Fraction
+from sqlalchemy import func, inspect, text
+from sqlalchemy.engine import make_url
+from shared_cache import make_cache
+import entry_archive
+logger = logging.getLogger(__name__)
 
-NUTRITIONIX_APP_ID = os.getenv("NUTRITIONIX_APP_ID")
-NUTRITIONIX_API_KEY = os.getenv("NUTRITIONIX_API_KEY")
+db = SQLAlchemy()
+bcrypt = Bcrypt()
+jwt_manager = JWTManager()
+cors = CORS()
+api = Blueprint('api', __name__, cli_group=None)
+
+
+def default_config():
+    return {
+        'JWT_SECRET_KEY': os.getenv('JWT_SECRET_KEY'),
+        'JWT_ACCESS_TOKEN_EXPIRES': datetime.timedelta(days=7),
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL', 'sqlite:///fitness.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'JWT_TOKEN_LOCATION': ['headers'],
+        'JWT_HEADER_NAME': 'Authorization',
+        'JWT_HEADER_TYPE': 'Bearer',
+        'NUTRITIONIX_APP_ID': os.getenv('NUTRITIONIX_APP_ID'),
+        'NUTRITIONIX_API_KEY': os.getenv('NUTRITIONIX_API_KEY'),
+        'NUTRITION_CACHE_MAX_ROWS': int(os.getenv('NUTRITION_CACHE_MAX_ROWS', 20000)),
+        'NUTRITION_CACHE_MAX_AGE_DAYS': int(os.getenv('NUTRITION_CACHE_MAX_AGE_DAYS', 180)),
+        'NUTRITION_CACHE_EVICT_INTERVAL': int(os.getenv('NUTRITION_CACHE_EVICT_INTERVAL', 300)),
+        # "<requests>/<second|minute|hour|day>" per user; empty disables the limit
+        'RATE_LIMITS': {
+            'nutritionix': os.getenv('RATE_LIMIT_NUTRITIONIX', '30/minute'),
+        },
+        # "memory" keeps buckets per process, "database" shares them across workers
+        'RATE_LIMIT_STORAGE': os.getenv('RATE_LIMIT_STORAGE', 'memory'),
+        # memory://, sqlite:///cache.db or redis://host:port/db, see shared_cache.py
+        'CACHE_URL': os.getenv('CACHE_URL', 'memory://'),
+        'NUTRITION_CACHE_TTL': int(os.getenv('NUTRITION_CACHE_TTL', 86400)),
+        'STATS_CACHE_TTL': int(os.getenv('STATS_CACHE_TTL', 60)),
+        # CalorieEntry rows older than this move to per-user monthly files in ARCHIVE_DIR
+        'ARCHIVE_DIR': os.getenv('ARCHIVE_DIR', 'archive'),
+        'ARCHIVE_HORIZON_DAYS': int(os.getenv('ARCHIVE_HORIZON_DAYS', 90)),
+        # /sync change-feed rows older than this are pruned; clients further behind get a full snapshot
+        'SYNC_RETENTION_DAYS': int(os.getenv('SYNC_RETENTION_DAYS', 30)),
+    }
+
+
+def create_app(config=None):
+    """Build the Flask app. Nothing touches the database until a request or CLI command needs it."""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    db.init_app(app)
+    bcrypt.init_app(app)
+    jwt_manager.init_app(app)
+    cors.init_app(app)
+    app.extensions['rate_limits'] = parse_rate_limits(app.config)
+    check_database_backend(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.extensions['shared_cache'] = make_cache(app.config['CACHE_URL'])
+    app.register_blueprint(api)
+
+    if hasattr(os, 'register_at_fork'):
+        # Preforking servers may load the app in the master; never share its pooled connections
+        app_ref = weakref.ref(app)
+        os.register_at_fork(after_in_child=lambda: _dispose_engines(app_ref()))
+
+    logger.info(
+        f"App created: database={app.config['SQLALCHEMY_DATABASE_URI']}, "
+        f"jwt_secret={'set' if app.config.get('JWT_SECRET_KEY') else 'MISSING'}, "
+        f"nutritionix={'mock' if is_nutritionix_mock(app) else 'real'}"
+    )
+    return app
+
+
+SUPPORTED_DATABASES = ('sqlite', 'postgresql')
+
+
+def check_database_backend(uri):
+    # /sync cursors rely on change ids becoming visible in id order, which record_change
+    # only guarantees on these backends
+    backend = make_url(uri).get_backend_name()
+    if backend not in SUPPORTED_DATABASES:
+        raise ValueError(f"Unsupported database '{backend}', expected one of {', '.join(SUPPORTED_DATABASES)}")
+
+
+def _dispose_engines(app):
+    if app is None:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def get_cache():
+    return current_app.extensions['shared_cache']
+
+
+def is_nutritionix_mock(app=None):
+    app = app or current_app
+    return app.config.get('NUTRITIONIX_APP_ID') in (None, '', 'your_app_id_here')
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = datetime.timedelta(days=7)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///fitness.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_HEADER_TYPE'] = 'Bearer'
-
-print(f"DEBUG: JWT Secret Key: {app.config.get('JWT_SECRET_KEY', 'NOT FOUND')}")
-print(f"DEBUG: Working directory: {os.getcwd()}")
-print(f"DEBUG: .env file exists: {os.path.exists('.env')}")
-print(f"DEBUG: NUTRITIONIX_APP_ID: {os.getenv('NUTRITIONIX_APP_ID', 'NOT FOUND')}")
-
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-jwt_manager = JWTManager(app)
 '''
 @jwt_manager.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
@@ -81,6 +171,12 @@ class User(db.Model):
 
 
 class CalorieEntry(db.Model):
+    # AUTOINCREMENT so ids of archived (deleted) rows are never handed out again
+    __table_args__ = (
+        db.Index('ix_calorie_entry_user_date', 'user_id', 'date'),
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -104,6 +200,8 @@ class CalorieEntry(db.Model):
 
 
 class ProgressEntry(db.Model):
+    __table_args__ = (db.Index('ix_progress_entry_user_date', 'user_id', 'date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     person_weight = db.Column(db.Float, nullable=False)
@@ -135,7 +233,103 @@ class UserGoals(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    def to_dict(self):
+        return {
+            "daily_calories": self.daily_calories,
+            "daily_protein": self.daily_protein,
+            "daily_carbs": self.daily_carbs,
+            "daily_fat": self.daily_fat,
+            "target_weight": self.target_weight
+        }
+
+
+class DailyNutritionSummary(db.Model):
+    # Per-day totals of archived CalorieEntry rows, kept in the live database
+    __table_args__ = (db.UniqueConstraint('user_id', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ChangeLog(db.Model):
+    # AUTOINCREMENT keeps ids strictly increasing, so an id is a valid sync cursor
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+
+SYNC_ENTITIES = {
+    'entry': ('entries', CalorieEntry),
+    'progress': ('progress', ProgressEntry),
+}
+
+
+# Any constant works; it only has to be the same for every writer of the change log
+CHANGE_LOG_LOCK_KEY = 0x66697473796e63
+
+
+def record_change(user_id, entity, entity_id, op='upsert'):
+    """Add a change-feed row to the current transaction; commit it together with the change."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Sequence ids can commit out of order on PostgreSQL, and a client whose cursor already
+        # passed the late id would skip it for good. Holding this lock until commit serialises
+        # change-log writers, so ids become visible in order. SQLite writers are serial anyway.
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK_KEY})
+    db.session.add(ChangeLog(user_id=user_id, entity=entity, entity_id=entity_id, op=op))
+
+
+def latest_sync_cursor():
+    # /sync filters by user, so the newest id overall is a valid cursor for everyone. Using the
+    # user's own newest id would leave quiet users behind the retention window and force snapshots.
+    return db.session.query(func.coalesce(func.max(ChangeLog.id), 0)).scalar()
+
+
+def oldest_sync_cursor():
+    """Oldest cursor /sync can still answer with a delta; older ones get a full snapshot."""
+    oldest_id = db.session.query(func.min(ChangeLog.id)).scalar()
+    return oldest_id - 1 if oldest_id is not None else 0
+
 
+def prune_change_log(retention_days=None):
+    """Delete change-feed rows older than SYNC_RETENTION_DAYS.
+
+    The newest row is always kept, so the oldest remaining id records how far pruning went.
+    """
+    retention_days = current_app.config['SYNC_RETENTION_DAYS'] if retention_days is None else retention_days
+    if retention_days <= 0:
+        return 0
+
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
+    try:
+        newest_id = latest_sync_cursor()
+        pruned = ChangeLog.query.filter(
+            ChangeLog.created_at < cutoff,
+            ChangeLog.id < newest_id
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Change log pruning failed: {e}")
+        return 0
+
+    if pruned:
+        logger.info(f"Pruned {pruned} change log rows older than {retention_days} days")
+    return pruned
+
+
+# NutritionCache.query is the cached query column, which shadows Model.query,
+# so this table is always queried through db.session.query(NutritionCache).
 class NutritionCache(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     query = db.Column(db.String(500), nullable=False, unique=True)
@@ -147,54 +341,930 @@ class NutritionCache(db.Model):
     serving_qty = db.Column(db.Float)
     serving_unit = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
+    hit_count = db.Column(db.Integer, default=0, nullable=False)
 
+    def to_dict(self):
+        return {
+            "food_name": self.food_name,
+            "calories": self.calories,
+            "protein": self.protein,
+            "carbs": self.carbs,
+            "fat": self.fat,
+            "serving_qty": self.serving_qty,
+            "serving_unit": self.serving_unit
+        }
 
-def get_current_user():
+
+class RateLimitBucket(db.Model):
+    key = db.Column(db.String(120), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
+
+
+RATE_LIMIT_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate_limit(limit):
+    """Turn "30/minute" into (capacity, tokens refilled per second)."""
+    count, _, period = str(limit).partition('/')
+    seconds = RATE_LIMIT_PERIODS.get(period.strip().rstrip('s'))
+    try:
+        capacity = float(count)
+    except ValueError:
+        capacity = None
+    if seconds is None or capacity is None or not capacity > 0:
+        raise ValueError(f"Invalid rate limit {limit!r}, expected e.g. '30/minute'")
+    return capacity, capacity / seconds
+
+
+def parse_rate_limits(config):
+    """Validate RATE_LIMITS and RATE_LIMIT_STORAGE once, at startup.
+
+    Returns {name: (capacity, rate)} for every enabled limit.
+    """
+    if config['RATE_LIMIT_STORAGE'] not in _rate_limiters:
+        raise ValueError(
+            f"Invalid RATE_LIMIT_STORAGE {config['RATE_LIMIT_STORAGE']!r}, "
+            f"expected one of {', '.join(_rate_limiters)}"
+        )
+    return {name: parse_rate_limit(limit) for name, limit in config['RATE_LIMITS'].items() if limit}
+
+
+class TokenBucketLimiter:
+    """In-process token buckets; a full bucket allows a burst of `capacity` requests."""
+
+    # Buckets that have refilled are dropped this often, they are the same as a missing one
+    PRUNE_INTERVAL = 60
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._pruned_at = 0
+
+    def consume(self, key, capacity, rate, now=None):
+        """Take one token. Returns 0 when allowed, otherwise seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now - self._pruned_at >= self.PRUNE_INTERVAL:
+                self._prune(now)
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            retry_after = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            return retry_after
+
+    def _prune(self, now):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._pruned_at = now
+
+
+class DatabaseTokenBucketLimiter:
+    """Token buckets in the rate_limit_bucket table so every worker draws from the same budget."""
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        refilled = RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * rate
+        refilled = db.case((refilled > capacity, capacity), else_=refilled)
+
+        try:
+            # Refill and take in one statement so concurrent workers cannot both spend the last token
+            taken = db.session.execute(
+                db.update(RateLimitBucket)
+                .where(RateLimitBucket.key == key, refilled >= 1)
+                .values(tokens=refilled - 1, updated_at=now)
+            ).rowcount
+            if not taken and db.session.get(RateLimitBucket, key) is None:
+                db.session.add(RateLimitBucket(key=key, tokens=capacity - 1, updated_at=now))
+                taken = 1
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            return 0
+
+        if taken:
+            return 0
+        bucket = db.session.get(RateLimitBucket, key)
+        tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * rate)
+        return max((1 - tokens) / rate, 0.001)
+
+
+_rate_limiters = {
+    'memory': TokenBucketLimiter(),
+    'database': DatabaseTokenBucketLimiter(),
+}
+
+
+def check_rate_limit(name):
+    """Spend one request from the caller's `name` budget; returns a 429 response when it is empty."""
+    limit = current_app.extensions['rate_limits'].get(name)
+    if not limit:
+        return None
+
+    capacity, rate = limit
+    limiter = _rate_limiters[current_app.config['RATE_LIMIT_STORAGE']]
+    retry_after = limiter.consume(f"{name}:{get_jwt_identity()}", capacity, rate)
+    if not retry_after:
+        return None
+
+    logger.warning(f"Rate limit '{name}' exceeded for user {get_jwt_identity()}")
+    response = jsonify({"error": "Too many requests - please try again shortly"})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+# Cache hits are buffered in memory and flushed by the janitor thread, so a
+# lookup never has to write to the database.
+CACHE_HIT_BUFFER_SIZE = 1000
+_cache_hits = {}
+_cache_hits_lock = threading.Lock()
+_cache_janitor = None
+_cache_janitor_lock = threading.Lock()
+
+
+def record_cache_hit(query):
+    now = datetime.datetime.utcnow()
+    with _cache_hits_lock:
+        count, _ = _cache_hits.get(query, (0, None))
+        _cache_hits[query] = (count + 1, now)
+        pending = len(_cache_hits)
+
+    # Without a janitor nothing else drains the buffer, and a full one must not keep growing
+    if current_app.config['NUTRITION_CACHE_EVICT_INTERVAL'] <= 0 or pending >= CACHE_HIT_BUFFER_SIZE:
+        flush_cache_hits()
+
+
+def flush_cache_hits():
+    with _cache_hits_lock:
+        pending = dict(_cache_hits)
+        _cache_hits.clear()
+
+    if not pending:
+        return 0
+
+    try:
+        for query, (count, last_accessed_at) in pending.items():
+            db.session.query(NutritionCache).filter(NutritionCache.query == query).update({
+                NutritionCache.hit_count: NutritionCache.hit_count + count,
+                NutritionCache.last_accessed_at: last_accessed_at
+            }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Failed to flush cache hits: {e}")
+        return 0
+    return len(pending)
+
+
+def evict_nutrition_cache(max_rows=None, max_age_days=None):
+    max_rows = current_app.config['NUTRITION_CACHE_MAX_ROWS'] if max_rows is None else max_rows
+    max_age_days = current_app.config['NUTRITION_CACHE_MAX_AGE_DAYS'] if max_age_days is None else max_age_days
+    last_used = func.coalesce(NutritionCache.last_accessed_at, NutritionCache.created_at)
+
+    try:
+        expired = 0
+        if max_age_days > 0:
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=max_age_days)
+            expired = db.session.query(NutritionCache).filter(last_used < cutoff).delete(synchronize_session=False)
+
+        overflow = 0
+        excess = db.session.query(NutritionCache).count() - max_rows
+        if max_rows > 0 and excess > 0:
+            # Least frequently used first, least recently used among equals
+            cold_ids = db.session.query(NutritionCache.id).order_by(
+                NutritionCache.hit_count.asc(), last_used.asc()
+            ).limit(excess).subquery()
+            overflow = db.session.query(NutritionCache).filter(
+                NutritionCache.id.in_(db.select(cold_ids.c.id))
+            ).delete(synchronize_session=False)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Nutrition cache eviction failed: {e}")
+        return 0
+
+    if expired or overflow:
+        logger.info(f"Evicted {expired} expired and {overflow} cold nutrition cache entries")
+    return expired + overflow
+
+
+def _run_cache_janitor(flask_app):
+    interval = flask_app.config['NUTRITION_CACHE_EVICT_INTERVAL']
+    while True:
+        time.sleep(interval)
+        with flask_app.app_context():
+            try:
+                flush_cache_hits()
+                evict_nutrition_cache()
+                prune_change_log()
+            finally:
+                db.session.remove()
+
+
+def start_cache_janitor():
+    # Started lazily from the first lookup so each worker process owns its thread
+    global _cache_janitor
+    if _cache_janitor is not None or current_app.config['NUTRITION_CACHE_EVICT_INTERVAL'] <= 0:
+        return
+    with _cache_janitor_lock:
+        if _cache_janitor is None:
+            _cache_janitor = threading.Thread(
+                target=_run_cache_janitor, args=(current_app._get_current_object(),), name="nutrition-cache-janitor", daemon=True
+            )
+            _cache_janitor.start()
+
+
+def upgrade_schema():
+    # create_all() never alters existing tables, so add columns introduced later
+    columns = {c['name'] for c in inspect(db.engine).get_columns('nutrition_cache')}
+    with db.engine.begin() as conn:
+        if 'last_accessed_at' not in columns:
+            conn.execute(text("ALTER TABLE nutrition_cache ADD COLUMN last_accessed_at DATETIME"))
+            conn.execute(text("UPDATE nutrition_cache SET last_accessed_at = created_at"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_nutrition_cache_last_accessed_at "
+                "ON nutrition_cache (last_accessed_at)"
+            ))
+        if 'hit_count' not in columns:
+            conn.execute(text("ALTER TABLE nutrition_cache ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 0"))
+
+    # Likewise for indexes added to tables that already exist
+    for model in (CalorieEntry, ProgressEntry):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    if db.engine.dialect.name == 'sqlite':
+        _upgrade_calorie_entry_autoincrement()
+
+
+def _upgrade_calorie_entry_autoincrement():
+    # SQLite cannot add AUTOINCREMENT to a table, so rebuild calorie_entry with it and move the
+    # id sequence past every archived id; before this, ids freed by archiving were reused
+    with db.engine.begin() as conn:
+        table_sql = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'calorie_entry'"
+        )).scalar() or ''
+        if 'AUTOINCREMENT' not in table_sql.upper():
+            columns = ", ".join(column.name for column in CalorieEntry.__table__.columns)
+            for index in inspect(conn).get_indexes('calorie_entry'):
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+            conn.execute(text("ALTER TABLE calorie_entry RENAME TO calorie_entry_old"))
+            CalorieEntry.__table__.create(conn)
+            conn.execute(text(
+                f"INSERT INTO calorie_entry ({columns}) SELECT {columns} FROM calorie_entry_old"
+            ))
+            conn.execute(text("DROP TABLE calorie_entry_old"))
+            logger.info("Rebuilt calorie_entry with AUTOINCREMENT ids")
+
+        floor = entry_archive.max_archived_id(archive_dir())
+        seeded = conn.execute(text(
+            "UPDATE sqlite_sequence SET seq = max(seq, :floor) WHERE name = 'calorie_entry'"
+        ), {"floor": floor}).rowcount
+        if not seeded and floor:
+            conn.execute(text(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('calorie_entry', :floor)"
+            ), {"floor": floor})
+
+
+_food_search_fts = None
+
+
+def ensure_food_search_index():
+    # External-content FTS5 index over the cache, kept in sync by triggers so
+    # inserts and janitor evictions never need to touch it directly
+    global _food_search_fts
+    if db.engine.dialect.name != 'sqlite':
+        _food_search_fts = False
+        return
+
+    try:
+        with db.engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'nutrition_cache_fts'"
+            )).first()
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS nutrition_cache_fts USING fts5("
+                "food_name, query, content='nutrition_cache', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS nutrition_cache_fts_ai AFTER INSERT ON nutrition_cache BEGIN "
+                "INSERT INTO nutrition_cache_fts(rowid, food_name, query) "
+                "VALUES (new.id, new.food_name, new.query); END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS nutrition_cache_fts_ad AFTER DELETE ON nutrition_cache BEGIN "
+                "INSERT INTO nutrition_cache_fts(nutrition_cache_fts, rowid, food_name, query) "
+                "VALUES ('delete', old.id, old.food_name, old.query); END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS nutrition_cache_fts_au "
+                "AFTER UPDATE OF food_name, query ON nutrition_cache BEGIN "
+                "INSERT INTO nutrition_cache_fts(nutrition_cache_fts, rowid, food_name, query) "
+                "VALUES ('delete', old.id, old.food_name, old.query); "
+                "INSERT INTO nutrition_cache_fts(rowid, food_name, query) "
+                "VALUES (new.id, new.food_name, new.query); END"
+            ))
+            if not exists:
+                conn.execute(text("INSERT INTO nutrition_cache_fts(nutrition_cache_fts) VALUES ('rebuild')"))
+        _food_search_fts = True
+    except Exception as e:
+        _food_search_fts = False
+        logger.warning(f"FTS5 unavailable, food search falls back to LIKE: {e}")
+
+
+def food_search_index_ready():
+    global _food_search_fts
+    if _food_search_fts is None:
+        _food_search_fts = db.engine.dialect.name == 'sqlite' and db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'nutrition_cache_fts'"
+        )).first() is not None
+    return _food_search_fts
+
+
+def search_cached_foods(term, limit=10):
+    tokens = re.findall(r"\w+", unicodedata.normalize("NFKD", term).lower())
+    if not tokens:
+        return []
+
+    columns = ("c.id, c.query, c.food_name, c.calories, c.protein, c.carbs, c.fat, "
+               "c.serving_qty, c.serving_unit")
+    if food_search_index_ready():
+        # Every token must match, the last one as a prefix of what is being typed
+        match = " ".join(f'"{token}"' for token in tokens[:-1])
+        match = f'{match} "{tokens[-1]}"*'.strip()
+        rows = db.session.execute(text(
+            f"SELECT {columns} FROM nutrition_cache_fts f "
+            "JOIN nutrition_cache c ON c.id = f.rowid "
+            "WHERE nutrition_cache_fts MATCH :match "
+            "ORDER BY bm25(nutrition_cache_fts, 2.0, 1.0), c.hit_count DESC "
+            "LIMIT :limit"
+        ), {"match": match, "limit": limit})
+    else:
+        prefix = " ".join(tokens) + "%"
+        rows = db.session.execute(text(
+            f"SELECT {columns} FROM nutrition_cache c "
+            "WHERE c.query LIKE :prefix OR lower(c.food_name) LIKE :prefix "
+            "ORDER BY c.hit_count DESC LIMIT :limit"
+        ), {"prefix": prefix, "limit": limit})
+
+    # Cached rows hold a single unit ("1 g chicken breast"); suggest a realistic serving instead
+    results = []
+    for row in rows:
+        unit, _, food = row.query.partition(" ")
+        if unit not in UNIT_VALUES or not food:
+            unit, food = None, row.query
+        quantity = DEFAULT_SERVINGS.get(unit, 1.0)
+        suggestion = scale_nutrition({
+            "food_name": row.food_name,
+            "calories": row.calories,
+            "protein": row.protein,
+            "carbs": row.carbs,
+            "fat": row.fat,
+            "serving_qty": row.serving_qty,
+            "serving_unit": row.serving_unit
+        }, quantity)
+        suggestion["query"] = row.query
+        suggestion["lookup_query"] = " ".join(filter(None, (f"{quantity:g}", unit, food)))
+        results.append(suggestion)
+    return results
+
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'half': 0.5, 'quarter': 0.25, 'dozen': 12, 'couple': 2
+}
+
+UNIT_ALIASES = {
+    'g': 'g', 'gr': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml',
+    'l': 'l', 'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'slice': 'slice', 'slices': 'slice',
+    'piece': 'piece', 'pieces': 'piece', 'pc': 'piece', 'pcs': 'piece',
+    'serving': 'serving', 'servings': 'serving',
+    'scoop': 'scoop', 'scoops': 'scoop',
+    'can': 'can', 'cans': 'can',
+    'bowl': 'bowl', 'bowls': 'bowl',
+    'glass': 'glass', 'glasses': 'glass'
+}
+
+UNIT_VALUES = set(UNIT_ALIASES.values())
+UNIT_PATTERN = "|".join(sorted(UNIT_ALIASES, key=len, reverse=True))
+
+# Serving suggested for a cached food, by unit; anything not listed defaults to one
+DEFAULT_SERVINGS = {'g': 100.0, 'ml': 250.0, 'oz': 4.0}
+
+FOOD_STOP_WORDS = {'of', 'the', 'some'}
+
+ParsedQuery = namedtuple('ParsedQuery', ['quantity', 'unit', 'food'])
+
+
+def _parse_number(token):
+    if token in NUMBER_WORDS:
+        return float(NUMBER_WORDS[token])
+    try:
+        return float(Fraction(token))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+# Plurals the suffix rules below would mangle
+IRREGULAR_SINGULARS = {
+    'cookies': 'cookie', 'brownies': 'brownie', 'smoothies': 'smoothie', 'pies': 'pie',
+    'veggies': 'veggie', 'hoagies': 'hoagie', 'molasses': 'molasses', 'fries': 'fries',
+    'grits': 'grits', 'chips': 'chips',
+}
+
+
+def _singularize(word):
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')) or not word.isalpha():
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'xes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def parse_food_query(raw_query):
+    """Split a free-text query into (quantity, unit, canonical food).
+
+    "2 eggs", "two eggs", "2  Eggs" and "egg x2" all parse to (2.0, None, "egg"),
+    so they share one cache row holding nutrition for a single serving.
+    """
+    text_query = unicodedata.normalize("NFKD", raw_query).encode("ascii", "ignore").decode().lower()
+    # "1,000 g" is a thousands separator, "1,5 cups" a decimal comma
+    text_query = re.sub(r"(\d),(\d{3})(?!\d)", r"\1\2", text_query)
+    text_query = re.sub(r"(\d),(\d)", r"\1.\2", text_query)
+    # A number is only split from a unit or "x" glued to it ("100g", "2x", "x2"); anything
+    # else stays one word, so "7up" and "2% milk" never read as quantities
+    text_query = re.sub(rf"(\d)({UNIT_PATTERN}|x)\b", r"\1 \2", text_query)
+    text_query = re.sub(r"\bx(\d)", r"x \1", text_query)
+    tokens = re.findall(r"\d+(?:\.\d+)?(?:/\d+)?(?:[%a-z]\w*%?)?|\.\d+|[a-z]\w*%?", text_query)
+
+    # "egg x2", "egg 2x" and "2x eggs" multipliers
+    multiplier = 1.0
+    if len(tokens) > 2 and tokens[-2] == 'x' and _parse_number(tokens[-1]) is not None:
+        multiplier = _parse_number(tokens[-1])
+        tokens = tokens[:-2]
+    elif len(tokens) > 2 and tokens[-1] == 'x' and _parse_number(tokens[-2]) is not None:
+        multiplier = _parse_number(tokens[-2])
+        tokens = tokens[:-2]
+    elif len(tokens) > 2 and tokens[1] == 'x' and _parse_number(tokens[0]) is not None:
+        del tokens[1]
+
+    quantity = None
+    while tokens:
+        value = _parse_number(tokens[0])
+        if value is None:
+            break
+        # "1 1/2 cups" adds up and "half a dozen" multiplies; two bare numbers
+        # such as "1 5 cups" are ambiguous, so the second one stays in the food name
+        if quantity is None:
+            quantity = value
+        elif value < 1 <= quantity and '/' in tokens[0]:
+            quantity += value
+        elif tokens[0] in NUMBER_WORDS:
+            quantity *= value
+        else:
+            break
+        tokens.pop(0)
+
+    unit = None
+    if tokens and tokens[0] in UNIT_ALIASES and len(tokens) > 1:
+        unit = UNIT_ALIASES[tokens.pop(0)]
+
+    food_words = [_singularize(token) for token in tokens if token not in FOOD_STOP_WORDS]
+    food = " ".join(food_words)
+    quantity = (quantity if quantity is not None else 1.0) * multiplier
+    if quantity <= 0:
+        raise ValueError("Quantity must be greater than zero")
+    return ParsedQuery(quantity, unit, food)
+
+
+def nutrition_cache_key(parsed):
+    return f"{parsed.unit} {parsed.food}" if parsed.unit else parsed.food
+
+
+def save_nutrition_cache(cache_key, base):
+    try:
+        cache_entry = NutritionCache(
+            query=cache_key,
+            food_name=base["food_name"],
+            calories=base["calories"],
+            protein=base["protein"],
+            carbs=base["carbs"],
+            fat=base["fat"],
+            serving_qty=base["serving_qty"],
+            serving_unit=base["serving_unit"]
+        )
+        db.session.add(cache_entry)
+        db.session.commit()
+        get_cache().set(f"nutrition:{cache_key}", base, ttl=current_app.config['NUTRITION_CACHE_TTL'])
+        logger.info(f"Cached nutrition data for: {cache_key}")
+    except Exception as cache_save_error:
+        logger.warning(f"Failed to cache nutrition data: {cache_save_error}")
+        db.session.rollback()
+
+
+def scale_nutrition(base, factor, digits=2):
+    scaled = dict(base)
+    for field in ('calories', 'protein', 'carbs', 'fat', 'serving_qty'):
+        if scaled.get(field) is not None:
+            scaled[field] = round(scaled[field] * factor, digits)
+    return scaled
+
+
+def per_unit_nutrition(result, parsed):
+    """Nutrition for one unit of `parsed`, derived from the serving Nutritionix reports.
+
+    Returns None when that serving disagrees with the parsed quantity or unit ("5 guys burger"
+    is one burger, not five), since caching it would serve a wrong row to every later lookup.
+    """
+    serving_qty = result.get('serving_qty')
+    if not serving_qty or not math.isclose(serving_qty, parsed.quantity, rel_tol=1e-3):
+        return None
+    if parsed.unit:
+        serving_unit = (result.get('serving_unit') or '').lower().split()
+        if not serving_unit or UNIT_ALIASES.get(serving_unit[0]) != parsed.unit:
+            return None
+    return scale_nutrition(result, 1 / serving_qty, digits=6)
+
+
+def stats_generation(user_id):
+    return get_cache().get(f"stats-gen:{user_id}") or 0
+
+
+def invalidate_user_stats(user_id):
+    # Bumping the generation orphans every cached summary for this user at once
+    get_cache().set(f"stats-gen:{user_id}", time.time_ns())
+
+
+def archive_dir():
+    return current_app.config['ARCHIVE_DIR']
+
+
+def user_entries(user_id, start=None, end=None):
+    """Entry dicts for a user, live and archived, newest first. Bounds are inclusive and optional."""
+    live = CalorieEntry.query.filter(CalorieEntry.user_id == user_id)
+    if start:
+        live = live.filter(CalorieEntry.date >= start)
+    if end:
+        live = live.filter(CalorieEntry.date <= end)
+    # Read live rows before the archive: a row being archived concurrently is then seen at least once
+    rows = [entry_archive.row_from_entry(entry) for entry in live.all()]
+
+    archived_before = db.session.query(func.max(DailyNutritionSummary.date)).filter(
+        DailyNutritionSummary.user_id == user_id
+    ).scalar()
+    if archived_before and (start is None or start <= archived_before):
+        # Ids alone are not unique across the two sources in databases created before
+        # calorie_entry used AUTOINCREMENT
+        seen = {(row['id'], row['created_at']) for row in rows}
+        rows += [row for row in entry_archive.read_range(archive_dir(), user_id, start, end)
+                 if (row['id'], row['created_at']) not in seen]
+
+    rows.sort(key=lambda row: (row['date'], row['created_at'] or ''), reverse=True)
+    return [{key: row[key] for key in ('id', 'name', 'calories', 'protein', 'carbs', 'fat', 'date')}
+            for row in rows]
+
+
+def archive_calorie_entries(horizon_days=None):
+    """Move entries older than the horizon into monthly archive files and roll them into daily summaries."""
+    horizon_days = current_app.config['ARCHIVE_HORIZON_DAYS'] if horizon_days is None else horizon_days
+    cutoff = datetime.date.today() - datetime.timedelta(days=horizon_days)
+    archived = 0
+
+    batches = db.session.query(CalorieEntry.user_id, func.min(CalorieEntry.date)).filter(
+        CalorieEntry.date < cutoff
+    ).group_by(CalorieEntry.user_id).all()
+
+    for user_id, oldest in batches:
+        month_start = oldest.replace(day=1)
+        while month_start < cutoff:
+            next_month = (month_start + datetime.timedelta(days=32)).replace(day=1)
+            archived += _archive_month(user_id, month_start, min(next_month, cutoff))
+            month_start = next_month
+
+    return archived
+
+
+def _archive_month(user_id, month_start, month_end):
+    # Rows are deleted first and the file and summaries are built from what the DELETE returned,
+    # all inside one transaction. Rows a user deleted meanwhile, or that an overlapping run
+    # already moved, are then never counted. A crash before the commit leaves the rows live and
+    # possibly also in the file, which the next run merges again by id.
     try:
-        print("DEBUG: get_current_user() called")
+        entries = db.session.execute(
+            db.delete(CalorieEntry).where(
+                CalorieEntry.user_id == user_id,
+                CalorieEntry.date >= month_start,
+                CalorieEntry.date < month_end
+            ).returning(*CalorieEntry.__table__.columns)
+        ).all()
+        if not entries:
+            db.session.rollback()
+            return 0
+
+        entry_archive.write_month(
+            archive_dir(), user_id, entry_archive.month_key(month_start),
+            [entry_archive.row_from_entry(entry) for entry in entries]
+        )
 
+        totals = {}
+        for entry in entries:
+            day = totals.setdefault(entry.date, [0.0, 0.0, 0.0, 0.0, 0])
+            day[0] += entry.calories
+            day[1] += entry.protein
+            day[2] += entry.carbs
+            day[3] += entry.fat
+            day[4] += 1
+
+        for date, (calories, protein, carbs, fat, count) in totals.items():
+            summary = DailyNutritionSummary.query.filter_by(user_id=user_id, date=date).first()
+            if not summary:
+                summary = DailyNutritionSummary(user_id=user_id, date=date, calories=0, protein=0,
+                                                carbs=0, fat=0, entry_count=0)
+                db.session.add(summary)
+            summary.calories += calories
+            summary.protein += protein
+            summary.carbs += carbs
+            summary.fat += fat
+            summary.entry_count += count
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"Archived {len(entries)} entries for user {user_id} ({entry_archive.month_key(month_start)})")
+    return len(entries)
+
+
+def delete_archived_entry(user_id, entry_id):
+    """Remove an archived entry from its month file and from the daily summary. Returns False if absent."""
+    def update_summary(row):
+        # Committed before the month file is rewritten, under its lock: a failed commit leaves both unchanged
+        try:
+            date = datetime.date.fromisoformat(row['date'])
+            summary = DailyNutritionSummary.query.filter_by(user_id=user_id, date=date).first()
+            if summary:
+                summary.calories -= row['calories']
+                summary.protein -= row['protein']
+                summary.carbs -= row['carbs']
+                summary.fat -= row['fat']
+                summary.entry_count -= 1
+                if summary.entry_count <= 0:
+                    db.session.delete(summary)
+            record_change(user_id, 'entry', entry_id, 'delete')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return entry_archive.remove_entry(archive_dir(), user_id, entry_id, on_remove=update_summary) is not None
+
+
+def get_current_user():
+    try:
         # Check if we're in a request context
         from flask import has_request_context
         if not has_request_context():
-            print("DEBUG: No request context")
+            logger.debug("get_current_user() called outside a request context")
             return None
 
-        from flask import request
-        auth_header = request.headers.get('Authorization')
-        print(f"DEBUG: Authorization header: {auth_header[:50] if auth_header else 'None'}...")
-
         user_id = get_jwt_identity()
-        print(f"DEBUG: JWT Identity: {user_id}")
-
         if user_id is None:
-            print("DEBUG: user_id is None")
+            logger.debug("No JWT identity on the request")
             return None
 
         user = User.query.get(user_id)
-        print(f"DEBUG: Found user: {user.username if user else 'None'}")
+        if user is None:
+            logger.debug(f"No user found for JWT identity {user_id}")
         return user
     except Exception as e:
-        print(f"DEBUG: Error getting current user: {e}")
         logger.error(f"Error getting current user: {e}")
         return None
 
 
-with app.app_context():
+def init_db():
     db.create_all()
-
-
-@app.route('/')
+    upgrade_schema()
+    ensure_food_search_index()
+
+
+@api.cli.command('init-db')
+def init_db_command():
+    """Create missing tables, columns and the food search index."""
+    init_db()
+    click.echo("Database initialized")
+
+
+@api.cli.command('cache-report')
+@click.option('--top', default=10, show_default=True, help='Number of popular queries to list.')
+def cache_report(top):
+    """Print nutrition cache size, hit distribution and most popular queries."""
+    flush_cache_hits()
+    total = db.session.query(NutritionCache).count()
+    total_hits = db.session.query(func.coalesce(func.sum(NutritionCache.hit_count), 0)).scalar()
+    oldest = db.session.query(func.min(NutritionCache.last_accessed_at)).scalar()
+
+    click.echo(f"Entries: {total} (max {current_app.config['NUTRITION_CACHE_MAX_ROWS']})")
+    click.echo(f"Total hits: {total_hits}")
+    click.echo(f"Least recently used: {oldest.isoformat() if oldest else '-'}"
+               f" (max age {current_app.config['NUTRITION_CACHE_MAX_AGE_DAYS']} days)")
+
+    click.echo("\nHit distribution:")
+    buckets = [(0, 0), (1, 1), (2, 9), (10, 99), (100, None)]
+    for low, high in buckets:
+        bucket = db.session.query(NutritionCache).filter(NutritionCache.hit_count >= low)
+        if high is not None:
+            bucket = bucket.filter(NutritionCache.hit_count <= high)
+        label = f"{low}+" if high is None else (str(low) if low == high else f"{low}-{high}")
+        click.echo(f"  {label:>8} hits: {bucket.count()}")
+
+    click.echo(f"\nTop {top} queries:")
+    popular = db.session.query(NutritionCache).order_by(NutritionCache.hit_count.desc()).limit(top).all()
+    for entry in popular:
+        click.echo(f"  {entry.hit_count:>8}  {entry.query}")
+
+
+SAMPLE_QUERY_CORPUS = [
+    "2 eggs", "two eggs", "2  Eggs", "egg x2", "1 egg", "3 eggs", "an egg", "Eggs",
+    "1 banana", "banana", "2 bananas", "a banana", "Banana",
+    "1 cup of rice", "1 cup rice", "2 cups rice", "1/2 cup rice", "half a cup of rice", "1 1/2 cups of rice",
+    "100g chicken breast", "100 g chicken breast", "200 grams chicken breast", "6 oz chicken breast",
+    "8 oz chicken breast", "chicken breast",
+    "1 slice of bread", "2 slices bread", "2 slices of bread", "slice of bread",
+    "1 apple", "apple", "2 apples", "an apple",
+    "1 tbsp peanut butter", "2 tbsp peanut butter", "1 tablespoon peanut butter", "2 tablespoons of peanut butter",
+    "1 glass of milk", "glass of milk", "1 cup milk", "2 cups of milk",
+    "1 scoop whey protein", "2 scoops whey protein", "scoop of whey protein",
+    "1 can tuna", "2 cans of tuna", "can of tuna",
+    "1 bowl oatmeal", "bowl of oatmeal", "1 cup oatmeal",
+    "3 strawberries", "10 strawberries", "1 cup strawberries",
+    "1 avocado", "half avocado", "avocado",
+    "2 tomatoes", "1 tomato", "tomato",
+    "1 large egg", "2 large eggs", "large eggs x3",
+]
+
+
+@api.cli.command('cache-hitrate')
+def cache_hitrate():
+    """Replay SAMPLE_QUERY_CORPUS against raw and normalized cache keys."""
+    def replay(key_for):
+        seen = set()
+        hits = 0
+        for query in SAMPLE_QUERY_CORPUS:
+            key = key_for(query)
+            if key in seen:
+                hits += 1
+            seen.add(key)
+        return hits, len(seen)
+
+    raw_hits, raw_rows = replay(
+        lambda q: unicodedata.normalize("NFKD", q).encode("ascii", "ignore").decode().strip().lower()
+    )
+    norm_hits, norm_rows = replay(lambda q: nutrition_cache_key(parse_food_query(q)))
+    total = len(SAMPLE_QUERY_CORPUS)
+
+    click.echo(f"Queries: {total}")
+    click.echo(f"Raw keys:        {raw_hits / total:6.1%} hit rate, {raw_rows} rows, {total - raw_hits} upstream calls")
+    click.echo(f"Normalized keys: {norm_hits / total:6.1%} hit rate, {norm_rows} rows, {total - norm_hits} upstream calls")
+
+
+STARTUP_PROBE = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+flask_app.test_client().get('/test')
+t3 = time.perf_counter()
+print(t1 - t0, t2 - t0, t3 - t0)
+"""
+
+
+@api.cli.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters to start.')
+def bench_startup(runs):
+    """Measure import time and cold start to first response in fresh interpreters."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_PROBE], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.split()
+        samples.append([float(value) * 1000 for value in output[-3:]])
+
+    for label, column in (("import app", 0), ("create_app()", 1), ("first response", 2)):
+        values = [sample[column] for sample in samples]
+        click.echo(f"{label:>15}: median {statistics.median(values):7.1f} ms, max {max(values):7.1f} ms")
+
+
+@api.cli.command('bench-ratelimit')
+@click.option('--checks', default=20000, show_default=True, help='consume() calls per limiter.')
+@click.option('--users', default=500, show_default=True, help='Distinct buckets the checks spread over.')
+def bench_ratelimit(checks, users):
+    """Measure the per-request overhead of each rate limiter's consume()."""
+    capacity, rate = 30.0, 0.5
+    for name, limiter in (("memory", TokenBucketLimiter()), ("database", DatabaseTokenBucketLimiter())):
+        count = checks if name == "memory" else max(checks // 20, 1)
+        latencies = []
+        for i in range(count):
+            start = time.perf_counter()
+            limiter.consume(f"bench:{i % users}", capacity, rate)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1_000_000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1_000_000
+        click.echo(f"{name:>8}: {count} checks, p50 {p50:8.1f} us, p99 {p99:8.1f} us")
+
+    RateLimitBucket.query.filter(RateLimitBucket.key.like('bench:%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+@api.cli.command('bench-cache')
+@click.option('--requests', 'request_count', default=4000, show_default=True, help='Lookups per run.')
+@click.option('--miss-ms', default=150.0, show_default=True, help='Assumed cost of an upstream lookup.')
+def bench_cache(request_count, miss_ms):
+    """Compare hit rate and latency of each cache backend at 1, 4 and 16 workers."""
+    import tempfile
+    from cache_bench import FakeRedisServer, benchmark_backend
+
+    fake_redis = FakeRedisServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = [
+                ("memory", "memory://"),
+                ("sqlite", f"sqlite:///{os.path.join(tmp, 'cache.db')}"),
+                ("redis", fake_redis.url),
+            ]
+            click.echo(f"{'backend':>8} {'workers':>8} {'hit rate':>9} {'get p50':>10} {'avg lookup':>11}")
+            for name, url in backends:
+                for workers in (1, 4, 16):
+                    hit_rate, get_us = benchmark_backend(url, workers, requests=request_count)
+                    avg_ms = get_us / 1000 + (1 - hit_rate) * miss_ms
+                    click.echo(f"{name:>8} {workers:>8} {hit_rate:>9.1%} {get_us:>8.1f}us {avg_ms:>9.1f}ms")
+    finally:
+        fake_redis.shutdown()
+        fake_redis.server_close()
+
+
+@api.cli.command('archive-entries')
+@click.option('--horizon-days', type=int, default=None,
+              help='Archive entries older than this many days (default: ARCHIVE_HORIZON_DAYS).')
+def archive_entries_command(horizon_days):
+    """Move old calorie entries to compressed monthly archives. Safe to run while serving."""
+    click.echo(f"Archived {archive_calorie_entries(horizon_days)} entries")
+
+
+@api.cli.command('prune-changes')
+@click.option('--retention-days', type=int, default=None,
+              help='Keep this many days of sync changes (default: SYNC_RETENTION_DAYS).')
+def prune_changes_command(retention_days):
+    """Delete old /sync change-feed rows. Clients with an older cursor get a full snapshot."""
+    click.echo(f"Pruned {prune_change_log(retention_days)} change log rows")
+
+
+@api.cli.command('cache-evict')
+def cache_evict():
+    """Flush buffered hits and evict expired or cold nutrition cache entries now."""
+    flush_cache_hits()
+    click.echo(f"Evicted {evict_nutrition_cache()} entries")
+
+
+@api.route('/')
 def index():
     return jsonify(message="Tracking Your Goals to Stay Fit")
 
 
-@app.route('/test')
+@api.route('/test')
 def test():
     return jsonify({"status": "Backend is working!", "timestamp": datetime.datetime.now().isoformat()})
 
 
 # Authentication Routes
-@app.route('/auth/register', methods=['POST'])
+@api.route('/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
@@ -230,6 +1300,8 @@ def register():
 
         default_goals = UserGoals(user_id=new_user.id)
         db.session.add(default_goals)
+        db.session.flush()
+        record_change(new_user.id, 'goals', default_goals.id)
         db.session.commit()
 
         access_token = create_access_token(identity=str(new_user.id))
@@ -247,7 +1319,7 @@ def register():
         return jsonify({"error": "Registration failed"}), 500
 
 
-@app.route('/auth/login', methods=['POST'])
+@api.route('/auth/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -282,7 +1354,7 @@ def login():
         return jsonify({"error": "Login failed"}), 500
 
 
-@app.route('/auth/verify', methods=['GET'])
+@api.route('/auth/verify', methods=['GET'])
 @jwt_required()
 def verify_token():
     try:
@@ -300,7 +1372,7 @@ def verify_token():
         return jsonify({"error": "Token verification failed"}), 401
 
 
-@app.route('/auth/profile', methods=['GET'])
+@api.route('/auth/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     try:
@@ -315,9 +1387,12 @@ def get_profile():
         return jsonify({"error": "Failed to fetch profile"}), 500
 
 
-@app.route('/api/nutritionix', methods=['POST'])
+@api.route('/api/nutritionix', methods=['POST'])
 @jwt_required()
 def get_nutritionix_data():
+    # Imported here: requests is only needed on a cache miss and costs ~40 ms at worker boot
+    import requests
+
     try:
         data = request.get_json()
         if not data or 'query' not in data:
@@ -329,56 +1404,57 @@ def get_nutritionix_data():
         if not food_query:
             return jsonify({"error": "No query provided"}), 400
 
+        start_cache_janitor()
+
+        try:
+            parsed = parse_food_query(food_query)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not parsed.food:
+            parsed = ParsedQuery(1.0, None, food_query.lower())
+        cache_key = nutrition_cache_key(parsed)
+
         try:
-            cached = NutritionCache.query.filter(NutritionCache.query == food_query.lower()).first()
+            shared = get_cache().get(f"nutrition:{cache_key}")
+            if shared:
+                record_cache_hit(cache_key)
+                return jsonify(scale_nutrition(shared, parsed.quantity))
+
+            cached = db.session.query(NutritionCache).filter(NutritionCache.query == cache_key).first()
             if cached:
-                logger.info(f"Cache hit for query: {food_query}")
-                return jsonify({
-                    "food_name": cached.food_name,
-                    "calories": cached.calories,
-                    "protein": cached.protein,
-                    "carbs": cached.carbs,
-                    "fat": cached.fat,
-                    "serving_qty": cached.serving_qty,
-                    "serving_unit": cached.serving_unit
-                })
+                logger.info(f"Cache hit for query: {food_query} ({cache_key})")
+                record_cache_hit(cached.query)
+                get_cache().set(f"nutrition:{cache_key}", cached.to_dict(),
+                                ttl=current_app.config['NUTRITION_CACHE_TTL'])
+                return jsonify(scale_nutrition(cached.to_dict(), parsed.quantity))
         except Exception as cache_error:
             logger.warning(f"Cache check failed: {cache_error}")
 
-        if NUTRITIONIX_APP_ID == "your_app_id_here":
+        # Only misses spend upstream quota, so cache hits above are never limited
+        limited = check_rate_limit('nutritionix')
+        if limited:
+            return limited
+
+        if is_nutritionix_mock():
             logger.info(f"Using mock data for: {food_query}")
+            # Like a real answer, the mock covers the whole requested amount
             mock_result = {
-                "food_name": f"Mock {food_query}",
+                "food_name": f"Mock {parsed.food}",
                 "calories": 150.0,
                 "protein": 5.0,
                 "carbs": 30.0,
                 "fat": 2.0,
-                "serving_qty": 1.0,
-                "serving_unit": "serving"
+                "serving_qty": parsed.quantity,
+                "serving_unit": parsed.unit or "serving"
             }
-
-            try:
-                cache_entry = NutritionCache(
-                    query=food_query.lower(),
-                    food_name=mock_result["food_name"],
-                    calories=mock_result["calories"],
-                    protein=mock_result["protein"],
-                    carbs=mock_result["carbs"],
-                    fat=mock_result["fat"],
-                    serving_qty=mock_result["serving_qty"],
-                    serving_unit=mock_result["serving_unit"]
-                )
-                db.session.add(cache_entry)
-                db.session.commit()
-            except Exception as cache_save_error:
-                logger.warning(f"Failed to cache mock data: {cache_save_error}")
-                db.session.rollback()
-
+            per_unit = per_unit_nutrition(mock_result, parsed)
+            if per_unit:
+                save_nutrition_cache(cache_key, per_unit)
             return jsonify(mock_result)
 
         headers = {
-            "x-app-id": NUTRITIONIX_APP_ID,
-            "x-app-key": NUTRITIONIX_API_KEY,
+            "x-app-id": current_app.config['NUTRITIONIX_APP_ID'],
+            "x-app-key": current_app.config['NUTRITIONIX_API_KEY'],
             "Content-Type": "application/json"
         }
 
@@ -403,23 +1479,14 @@ def get_nutritionix_data():
                 "serving_unit": food['serving_unit']
             }
 
-            try:
-                cache_entry = NutritionCache(
-                    query=food_query.lower(),
-                    food_name=result["food_name"],
-                    calories=result["calories"],
-                    protein=result["protein"],
-                    carbs=result["carbs"],
-                    fat=result["fat"],
-                    serving_qty=result["serving_qty"],
-                    serving_unit=result["serving_unit"]
-                )
-                db.session.add(cache_entry)
-                db.session.commit()
-                logger.info(f"Cached nutrition data for: {food_query}")
-            except Exception as cache_save_error:
-                logger.warning(f"Failed to cache nutrition data: {cache_save_error}")
-                db.session.rollback()
+            # Nutritionix answers for the requested amount; cache a single serving, but only
+            # when it read the query the same way the parser did
+            per_unit = per_unit_nutrition(result, parsed)
+            if per_unit:
+                save_nutrition_cache(cache_key, per_unit)
+            else:
+                logger.info(f"Not caching '{food_query}': Nutritionix served "
+                            f"{result['serving_qty']} {result['serving_unit']}, parsed {parsed.quantity} {parsed.unit}")
 
             return jsonify(result)
 
@@ -438,21 +1505,33 @@ def get_nutritionix_data():
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/entries', methods=['GET'])
+@api.route('/foods/search', methods=['GET'])
+@jwt_required()
+def search_foods():
+    try:
+        term = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 25)
+        if not term:
+            return jsonify({"error": "q parameter required"}), 400
+
+        return jsonify({"query": term, "results": search_cached_foods(term[:100], limit)})
+    except Exception as e:
+        logger.error(f"Error searching foods: {e}")
+        return jsonify({"error": "Failed to search foods"}), 500
+
+
+@api.route('/entries', methods=['GET'])
 @jwt_required()
 def get_entries():
     try:
         current_user = get_current_user()
-        entries = CalorieEntry.query.filter_by(user_id=current_user.id).order_by(
-            CalorieEntry.date.desc(), CalorieEntry.created_at.desc()
-        ).all()
-        return jsonify([entry.to_dict() for entry in entries])
+        return jsonify(user_entries(current_user.id))
     except Exception as e:
         logger.error(f"Error fetching entries: {e}")
         return jsonify({"error": "Failed to fetch entries"}), 500
 
 
-@app.route('/entries', methods=['POST'])
+@api.route('/entries', methods=['POST'])
 @jwt_required()
 def add_entry():
     try:
@@ -475,7 +1554,10 @@ def add_entry():
             fat=float(data['fat'])
         )
         db.session.add(new_entry)
+        db.session.flush()
+        record_change(current_user.id, 'entry', new_entry.id)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         logger.info(f"Added calorie entry for user {current_user.username}: {data['name']}")
         return jsonify({
@@ -490,7 +1572,7 @@ def add_entry():
         return jsonify({"error": "Failed to add entry"}), 500
 
 
-@app.route('/entries/today', methods=['GET'])
+@api.route('/entries/today', methods=['GET'])
 @jwt_required()
 def get_today_entries():
     try:
@@ -506,7 +1588,7 @@ def get_today_entries():
         return jsonify({"error": "Failed to fetch entries"}), 500
 
 
-@app.route('/entries/<int:id>', methods=['DELETE'])
+@api.route('/entries/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_entry(id):
     try:
@@ -514,10 +1596,17 @@ def delete_entry(id):
         entry = CalorieEntry.query.filter_by(id=id, user_id=current_user.id).first()
 
         if not entry:
+            # /entries also lists archived entries, so they can be deleted too
+            if delete_archived_entry(current_user.id, id):
+                invalidate_user_stats(current_user.id)
+                logger.info(f"Deleted archived calorie entry {id} for user {current_user.username}")
+                return jsonify({"message": "Entry deleted successfully!"}), 200
             return jsonify({"error": "Entry not found or access denied"}), 404
 
+        record_change(current_user.id, 'entry', entry.id, 'delete')
         db.session.delete(entry)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
         logger.info(f"Deleted calorie entry {id} for user {current_user.username}")
         return jsonify({"message": "Entry deleted successfully!"}), 200
     except Exception as e:
@@ -526,7 +1615,7 @@ def delete_entry(id):
         return jsonify({"error": "Failed to delete entry"}), 500
 
 
-@app.route('/entries/date-range', methods=['GET'])
+@api.route('/entries/date-range', methods=['GET'])
 @jwt_required()
 def get_entries_by_date_range():
     try:
@@ -543,18 +1632,15 @@ def get_entries_by_date_range():
         except ValueError:
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
-        entries = CalorieEntry.query.filter(
-            CalorieEntry.user_id == current_user.id,
-            CalorieEntry.date.between(start, end)
-        ).order_by(CalorieEntry.date.desc()).all()
+        entries = user_entries(current_user.id, start, end)
 
         # Group by date
         entries_by_date = {}
         for entry in entries:
-            date_str = entry.date.isoformat()
+            date_str = entry['date']
             if date_str not in entries_by_date:
                 entries_by_date[date_str] = []
-            entries_by_date[date_str].append(entry.to_dict())
+            entries_by_date[date_str].append(entry)
 
         return jsonify(entries_by_date)
     except Exception as e:
@@ -562,17 +1648,13 @@ def get_entries_by_date_range():
         return jsonify({"error": "Failed to fetch entries"}), 500
 
 
-@app.route('/entries/<date>', methods=['GET'])
+@api.route('/entries/<date>', methods=['GET'])
 @jwt_required()
 def get_entries_by_date(date):
     try:
         current_user = get_current_user()
         target_date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
-        entries = CalorieEntry.query.filter_by(
-            user_id=current_user.id,
-            date=target_date
-        ).order_by(CalorieEntry.created_at.desc()).all()
-        return jsonify([entry.to_dict() for entry in entries])
+        return jsonify(user_entries(current_user.id, target_date, target_date))
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
     except Exception as e:
@@ -580,7 +1662,7 @@ def get_entries_by_date(date):
         return jsonify({"error": "Failed to fetch entries"}), 500
 
 
-@app.route('/progress', methods=['POST'])
+@api.route('/progress', methods=['POST'])
 @jwt_required()
 def add_progress():
     try:
@@ -602,7 +1684,10 @@ def add_progress():
             dead_lift=float(data['dead_lift']),
         )
         db.session.add(new_progress_entry)
+        db.session.flush()
+        record_change(current_user.id, 'progress', new_progress_entry.id)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
 
         logger.info(f"Added progress entry for user {current_user.username}: Weight {data['person_weight']}, Bench {data['bench']}")
         return jsonify({
@@ -617,7 +1702,7 @@ def add_progress():
         return jsonify({"error": "Failed to add progress entry"}), 500
 
 
-@app.route('/progress', methods=['GET'])
+@api.route('/progress', methods=['GET'])
 @jwt_required()
 def get_progress_entries():
     try:
@@ -629,7 +1714,7 @@ def get_progress_entries():
         return jsonify({"error": "Failed to fetch progress entries"}), 500
 
 
-@app.route('/progress/<int:id>', methods=['DELETE'])
+@api.route('/progress/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_progress_entry(id):
     try:
@@ -639,8 +1724,10 @@ def delete_progress_entry(id):
         if not entry:
             return jsonify({"error": "Progress entry not found or access denied"}), 404
 
+        record_change(current_user.id, 'progress', entry.id, 'delete')
         db.session.delete(entry)
         db.session.commit()
+        invalidate_user_stats(current_user.id)
         logger.info(f"Deleted progress entry {id} for user {current_user.username}")
         return jsonify({"message": "Progress entry deleted successfully!"}), 200
     except Exception as e:
@@ -649,7 +1736,7 @@ def delete_progress_entry(id):
         return jsonify({"error": "Failed to delete progress entry"}), 500
 
 
-@app.route('/progress/date-range', methods=['GET'])
+@api.route('/progress/date-range', methods=['GET'])
 @jwt_required()
 def get_progress_by_date_range():
     try:
@@ -684,7 +1771,7 @@ def get_progress_by_date_range():
         return jsonify({"error": "Failed to fetch progress entries"}), 500
 
 
-@app.route('/progress/<date>', methods=['GET'])
+@api.route('/progress/<date>', methods=['GET'])
 @jwt_required()
 def get_progress_by_date(date):
     try:
@@ -702,7 +1789,7 @@ def get_progress_by_date(date):
         return jsonify({"error": "Failed to fetch progress entries"}), 500
 
 
-@app.route('/goals', methods=['GET'])
+@api.route('/goals', methods=['GET'])
 @jwt_required()
 def get_goals():
     try:
@@ -717,19 +1804,13 @@ def get_goals():
                 "target_weight": None
             })
 
-        return jsonify({
-            "daily_calories": goals.daily_calories,
-            "daily_protein": goals.daily_protein,
-            "daily_carbs": goals.daily_carbs,
-            "daily_fat": goals.daily_fat,
-            "target_weight": goals.target_weight
-        })
+        return jsonify(goals.to_dict())
     except Exception as e:
         logger.error(f"Error fetching goals: {e}")
         return jsonify({"error": "Failed to fetch goals"}), 500
 
 
-@app.route('/goals', methods=['POST'])
+@api.route('/goals', methods=['POST'])
 @jwt_required()
 def update_goals():
     try:
@@ -755,6 +1836,8 @@ def update_goals():
             goals.target_weight = float(data['target_weight']) if data['target_weight'] else None
 
         goals.updated_at = datetime.datetime.utcnow()
+        db.session.flush()
+        record_change(current_user.id, 'goals', goals.id)
         db.session.commit()
 
         logger.info(f"Updated goals for user {current_user.username}: {data}")
@@ -767,38 +1850,196 @@ def update_goals():
         return jsonify({"error": "Failed to update goals"}), 500
 
 
-@app.route('/stats/summary', methods=['GET'])
+@api.route('/sync/cursor', methods=['GET'])
+@jwt_required()
+def get_sync_cursor():
+    try:
+        return jsonify({"cursor": latest_sync_cursor()})
+    except Exception as e:
+        logger.error(f"Error fetching sync cursor: {e}")
+        return jsonify({"error": "Failed to fetch sync cursor"}), 500
+
+
+@api.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_changes():
+    try:
+        current_user = get_current_user()
+        since = request.args.get('since')
+        limit = min(max(request.args.get('limit', 500, type=int), 1), 1000)
+
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return jsonify({"error": "since must be an integer cursor"}), 400
+
+        # Read the cursor before anything else so changes racing this request are replayed later
+        cursor = latest_sync_cursor()
+        if since is None or since < oldest_sync_cursor() or since > cursor:
+            # No cursor, changes after it were pruned, or it comes from another database: full snapshot
+            goals = UserGoals.query.filter_by(user_id=current_user.id).first()
+            return jsonify({
+                "cursor": cursor,
+                "full": True,
+                "has_more": False,
+                "entries": user_entries(current_user.id),
+                "progress": [e.to_dict() for e in ProgressEntry.query.filter_by(user_id=current_user.id).all()],
+                "goals": goals.to_dict() if goals else None,
+                "deleted": {"entries": [], "progress": []}
+            })
+
+        changes = ChangeLog.query.filter(
+            ChangeLog.user_id == current_user.id,
+            ChangeLog.id > since,
+            ChangeLog.id <= cursor
+        ).order_by(ChangeLog.id.asc()).limit(limit + 1).all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # Only the last change per row matters to a client
+        latest = {}
+        for change in changes:
+            latest[(change.entity, change.entity_id)] = change.op
+
+        result = {
+            "cursor": changes[-1].id if has_more else cursor,
+            "full": False,
+            "has_more": has_more,
+            "entries": [],
+            "progress": [],
+            "goals": None,
+            "deleted": {"entries": [], "progress": []}
+        }
+        for entity, (key, model) in SYNC_ENTITIES.items():
+            upserted = [entity_id for (kind, entity_id), op in latest.items() if kind == entity and op == 'upsert']
+            deleted = [entity_id for (kind, entity_id), op in latest.items() if kind == entity and op == 'delete']
+            if upserted:
+                rows = model.query.filter(model.user_id == current_user.id, model.id.in_(upserted)).all()
+                result[key] = [row.to_dict() for row in rows]
+            result["deleted"][key] = deleted
+
+        if any(kind == 'goals' for kind, _ in latest):
+            goals = UserGoals.query.filter_by(user_id=current_user.id).first()
+            result["goals"] = goals.to_dict() if goals else None
+
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error syncing changes: {e}")
+        return jsonify({"error": "Failed to sync changes"}), 500
+
+
+@api.route('/calendar/heatmap', methods=['GET'])
+@jwt_required()
+def get_calendar_heatmap():
+    try:
+        current_user = get_current_user()
+        year = request.args.get('year', str(datetime.date.today().year))
+        try:
+            year = int(year)
+        except ValueError:
+            return jsonify({"error": "year must be an integer"}), 400
+        if not 1900 <= year <= 9999:
+            return jsonify({"error": "Invalid year"}), 400
+
+        start = datetime.date(year, 1, 1)
+        end = datetime.date(year, 12, 31)
+        day_count = (end - start).days + 1
+
+        # Live entries, archived daily summaries and progress markers in one grouped query
+        days = db.union_all(
+            db.select(CalorieEntry.date.label('day'), CalorieEntry.calories.label('calories'),
+                      db.literal(0).label('progress')).where(
+                CalorieEntry.user_id == current_user.id, CalorieEntry.date.between(start, end)),
+            db.select(DailyNutritionSummary.date, DailyNutritionSummary.calories, db.literal(0)).where(
+                DailyNutritionSummary.user_id == current_user.id,
+                DailyNutritionSummary.date.between(start, end)),
+            db.select(ProgressEntry.date, db.literal(0.0), db.literal(1)).where(
+                ProgressEntry.user_id == current_user.id, ProgressEntry.date.between(start, end)),
+        ).subquery()
+        rows = db.session.execute(
+            db.select(days.c.day, func.sum(days.c.calories), func.max(days.c.progress)).group_by(days.c.day)
+        ).all()
+        goals = UserGoals.query.filter_by(user_id=current_user.id).first()
+        daily_goal = goals.daily_calories if goals and goals.daily_calories else 2000
+
+        # Array-encoded: index i is start + i days
+        calories = [0] * day_count
+        adherence = [0] * day_count
+        progress = [0] * day_count
+        for day, day_calories, has_progress in rows:
+            if isinstance(day, str):
+                day = datetime.date.fromisoformat(day)
+            i = (day - start).days
+            calories[i] = round(day_calories or 0)
+            adherence[i] = round(100 * calories[i] / daily_goal)
+            progress[i] = has_progress
+
+        return jsonify({
+            "year": year,
+            "start": start.isoformat(),
+            "goal": daily_goal,
+            "calories": calories,
+            "adherence": adherence,
+            "progress": progress
+        })
+    except Exception as e:
+        logger.error(f"Error fetching calendar heatmap: {e}")
+        return jsonify({"error": "Failed to fetch calendar heatmap"}), 500
+
+
+@api.route('/stats/summary', methods=['GET'])
 @jwt_required()
 def get_summary_stats():
     try:
-        print("DEBUG: Inside stats endpoint")
         current_user = get_current_user()
-        print(f"DEBUG: Current user in stats: {current_user}")
         if not current_user:
-            print("DEBUG: No current user found in stats")
             return jsonify({"error": "User not found"}), 401
         days = request.args.get('days', 7, type=int)
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=days - 1)
 
-        calorie_entries = CalorieEntry.query.filter(
+        # A per-process cache would keep serving stats that another worker has since invalidated
+        cache_stats = get_cache().shared and current_app.config['STATS_CACHE_TTL'] > 0
+        if cache_stats:
+            stats_key = f"stats:{current_user.id}:{stats_generation(current_user.id)}:{end_date.isoformat()}:{days}"
+            cached_stats = get_cache().get(stats_key)
+            if cached_stats:
+                return jsonify(cached_stats)
+
+        # Archived days only survive as daily summaries, so add both sources
+        live_totals = db.session.query(
+            func.coalesce(func.sum(CalorieEntry.calories), 0),
+            func.coalesce(func.sum(CalorieEntry.protein), 0),
+            func.coalesce(func.sum(CalorieEntry.carbs), 0),
+            func.coalesce(func.sum(CalorieEntry.fat), 0),
+            func.count(CalorieEntry.id)
+        ).filter(
             CalorieEntry.user_id == current_user.id,
             CalorieEntry.date.between(start_date, end_date)
-        ).all()
+        ).one()
+        archived_totals = db.session.query(
+            func.coalesce(func.sum(DailyNutritionSummary.calories), 0),
+            func.coalesce(func.sum(DailyNutritionSummary.protein), 0),
+            func.coalesce(func.sum(DailyNutritionSummary.carbs), 0),
+            func.coalesce(func.sum(DailyNutritionSummary.fat), 0),
+            func.coalesce(func.sum(DailyNutritionSummary.entry_count), 0)
+        ).filter(
+            DailyNutritionSummary.user_id == current_user.id,
+            DailyNutritionSummary.date.between(start_date, end_date)
+        ).one()
+        total_calories, total_protein, total_carbs, total_fat, entries_count = (
+            live + archived for live, archived in zip(live_totals, archived_totals)
+        )
 
         progress_entries = ProgressEntry.query.filter(
             ProgressEntry.user_id == current_user.id,
             ProgressEntry.date.between(start_date, end_date)
         ).order_by(ProgressEntry.date.desc()).all()
 
-        total_calories = sum(e.calories for e in calorie_entries)
-        total_protein = sum(e.protein for e in calorie_entries)
-        total_carbs = sum(e.carbs for e in calorie_entries)
-        total_fat = sum(e.fat for e in calorie_entries)
-
         latest_progress = progress_entries[0] if progress_entries else None
 
-        return jsonify({
+        stats = {
             "period": f"Last {days} days",
             "nutrition": {
                 "total_calories": total_calories,
@@ -808,44 +2049,50 @@ def get_summary_stats():
                 "total_fat": total_fat
             },
             "latest_progress": latest_progress.to_dict() if latest_progress else None,
-            "entries_count": len(calorie_entries),
+            "entries_count": entries_count,
             "progress_entries_count": len(progress_entries)
-        })
+        }
+        if cache_stats:
+            get_cache().set(stats_key, stats, ttl=current_app.config['STATS_CACHE_TTL'])
+        return jsonify(stats)
     except Exception as e:
         logger.error(f"Error fetching summary stats: {e}")
         return jsonify({"error": "Failed to fetch summary statistics"}), 500
 
 
 # Error handlers
-@app.errorhandler(401)
+@api.app_errorhandler(401)
 def unauthorized(error):
     return jsonify({"error": "Authentication required"}), 401
 
 
-@app.errorhandler(403)
+@api.app_errorhandler(403)
 def forbidden(error):
     return jsonify({"error": "Access forbidden"}), 403
 
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Resource not found"}), 404
 
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return jsonify({"error": "Internal server error"}), 500
 
 
 if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        init_db()
     print("Starting Flask app with Authentication...")
     print("Backend will be available at: http://localhost:5000")
     print("Test endpoint: http://localhost:5000/test")
-    print(f"Using Nutritionix API: {'Real API' if NUTRITIONIX_APP_ID != 'your_app_id_here' else 'Mock Data'}")
+    print(f"Using Nutritionix API: {'Mock Data' if is_nutritionix_mock(app) else 'Real API'}")
     print("Authentication endpoints available:")
     print("  POST /auth/register - Register new user")
     print("  POST /auth/login - User login")
     print("  GET /auth/verify - Verify token")
     print("  GET /auth/profile - Get user profile")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
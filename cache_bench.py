@@ -0,0 +1,131 @@
+"""Benchmark harness for the shared cache backends, used by `flask bench-cache`.
+
+FakeRedisServer speaks enough of the Redis protocol for RedisCache, so the
+benchmark and the tests run without a Redis install. Not imported by the app
+at runtime.
+"""
+import fnmatch
+import random
+import socketserver
+import statistics
+import threading
+import time
+
+from shared_cache import make_cache, read_resp
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                args = read_resp(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            command = args[0].decode().upper()
+            with server.lock:
+                reply = server.execute(command, args[1:])
+            self.wfile.write(reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """In-memory stand-in speaking enough of the Redis protocol for RedisCache."""
+
+    daemon_threads = True
+    request_queue_size = 128
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _FakeRedisHandler)
+        self.lock = threading.Lock()
+        self.store = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="fake-redis", daemon=True).start()
+        return self
+
+    def execute(self, command, args):
+        now = time.time()
+        if command == 'PING':
+            return b"+PONG\r\n"
+        if command in ('SELECT', 'AUTH'):
+            return b"+OK\r\n"
+        if command == 'GET':
+            value, expires_at = self.store.get(args[0], (None, None))
+            if value is None or (expires_at is not None and expires_at <= now):
+                self.store.pop(args[0], None)
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == 'SET':
+            expires_at = None
+            if len(args) >= 4 and args[2].upper() in (b'EX', b'PX'):
+                scale = 1 if args[2].upper() == b'EX' else 0.001
+                expires_at = now + int(args[3]) * scale
+            self.store[args[0]] = (args[1], expires_at)
+            return b"+OK\r\n"
+        if command == 'DEL':
+            removed = sum(1 for key in args if self.store.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        if command == 'SCAN':
+            # Everything in one batch, so the returned cursor is always 0
+            pattern = args[args.index(b'MATCH') + 1] if b'MATCH' in args else b'*'
+            keys = [key for key in self.store if fnmatch.fnmatchcase(key, pattern)]
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n%s" % (
+                len(keys), b"".join(b"$%d\r\n%s\r\n" % (len(key), key) for key in keys)
+            )
+        if command == 'FLUSHDB':
+            self.store.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command.encode()
+
+
+def _zipf_keys(count, distinct, seed, skew=1.1):
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, distinct + 1)]
+    return rng.choices([f"nutrition:food{i}" for i in range(distinct)], weights=weights, k=count)
+
+
+def _bench_worker(url, keys, results):
+    cache = make_cache(url)
+    hits = 0
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        value = cache.get(key)
+        latencies.append(time.perf_counter() - start)
+        if value is not None:
+            hits += 1
+        else:
+            cache.set(key, {"calories": 100.0}, ttl=3600)
+    results.put((hits, latencies))
+
+
+def benchmark_backend(url, workers, requests=4000, distinct=500, seed=7):
+    """Replay a Zipf-distributed lookup stream split across `workers` processes.
+
+    Returns (hit rate, median get latency in microseconds).
+    """
+    import multiprocessing
+
+    make_cache(url).clear()
+    keys = _zipf_keys(requests, distinct, seed)
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_bench_worker, args=(url, keys[i::workers], results))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    hits = sum(hits for hits, _ in collected)
+    latencies = [latency for _, worker_latencies in collected for latency in worker_latencies]
+    return hits / requests, statistics.median(latencies) * 1_000_000
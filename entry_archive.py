@@ -0,0 +1,166 @@
+"""Cold storage for old CalorieEntry rows.
+
+Each user gets one gzip-compressed, column-oriented JSON file per month:
+
+    <root>/<user_id>/<YYYY-MM>.json.gz
+    {"columns": [...], "id": [...], "name": [...], "calories": [...], ...}
+
+Files are replaced atomically, and rows are merged by id. A reader can
+therefore race the archive job and at worst see a row both here and in the
+live table. Callers dedupe by (id, created_at). Writers take an exclusive
+lock on a <YYYY-MM>.lock sidecar file, so the archive job and deletes can
+update the same month from different processes.
+"""
+import contextlib
+import gzip
+import json
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+COLUMNS = ('id', 'name', 'calories', 'protein', 'carbs', 'fat', 'date', 'created_at')
+
+
+def month_key(date):
+    return date.strftime('%Y-%m')
+
+
+def month_path(root, user_id, month):
+    return os.path.join(root, str(user_id), f"{month}.json.gz")
+
+
+def read_month(root, user_id, month):
+    path = month_path(root, user_id, month)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    columns = data['columns']
+    return [dict(zip(columns, values)) for values in zip(*(data[column] for column in columns))]
+
+
+@contextlib.contextmanager
+def month_lock(root, user_id, month):
+    """Exclusive lock for one user-month, held across a read-modify-write of its file."""
+    path = os.path.join(root, str(user_id), f"{month}.lock")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_month(root, user_id, month, rows):
+    """Merge `rows` into the month file, replacing it atomically."""
+    with month_lock(root, user_id, month):
+        merged = {row['id']: row for row in read_month(root, user_id, month)}
+        merged.update((row['id'], row) for row in rows)
+        return _replace_month(root, user_id, month, merged.values())
+
+
+def remove_entry(root, user_id, entry_id, on_remove=None):
+    """Drop one archived row, newest month first. Returns the removed row, or None.
+
+    `on_remove(row)` runs under the month lock before the file is rewritten, so the caller
+    can commit its own bookkeeping first; if it raises, the file is left unchanged.
+    """
+    for month in reversed(archived_months(root, user_id)):
+        with month_lock(root, user_id, month):
+            rows = read_month(root, user_id, month)
+            kept = [row for row in rows if row['id'] != entry_id]
+            if len(kept) == len(rows):
+                continue
+            removed = next(row for row in rows if row['id'] == entry_id)
+            if on_remove:
+                on_remove(removed)
+            _replace_month(root, user_id, month, kept)
+            return removed
+    return None
+
+
+def _replace_month(root, user_id, month, rows):
+    ordered = sorted(rows, key=lambda row: (row['date'], row['created_at'] or '', row['id']))
+
+    data = {'columns': list(COLUMNS)}
+    for column in COLUMNS:
+        data[column] = [row[column] for row in ordered]
+
+    path = month_path(root, user_id, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            f.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(ordered)
+
+
+def archived_months(root, user_id):
+    try:
+        names = os.listdir(os.path.join(root, str(user_id)))
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len('.json.gz')] for name in names if name.endswith('.json.gz'))
+
+
+def read_range(root, user_id, start=None, end=None):
+    """Archived rows with start <= date <= end (either bound may be None)."""
+    first = month_key(start) if start else None
+    last = month_key(end) if end else None
+    start_iso = start.isoformat() if start else None
+    end_iso = end.isoformat() if end else None
+
+    rows = []
+    for month in archived_months(root, user_id):
+        if (first and month < first) or (last and month > last):
+            continue
+        for row in read_month(root, user_id, month):
+            if (start_iso and row['date'] < start_iso) or (end_iso and row['date'] > end_iso):
+                continue
+            rows.append(row)
+    return rows
+
+
+def max_archived_id(root):
+    """Highest entry id in any archive file, 0 when there are none."""
+    try:
+        user_dirs = os.listdir(root)
+    except FileNotFoundError:
+        return 0
+    highest = 0
+    for user_id in user_dirs:
+        for month in archived_months(root, user_id):
+            highest = max([highest] + [row['id'] for row in read_month(root, user_id, month)])
+    return highest
+
+
+def row_from_entry(entry):
+    return {
+        'id': entry.id,
+        'name': entry.name,
+        'calories': entry.calories,
+        'protein': entry.protein,
+        'carbs': entry.carbs,
+        'fat': entry.fat,
+        'date': entry.date.isoformat(),
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+    }
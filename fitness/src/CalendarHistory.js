@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback, useMemo } from 'react';
 import ReactDOM from 'react-dom';
 import './CalendarHistory.css';
+import { apiEndpoints } from './apiUtils';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
@@ -46,6 +47,17 @@ const TooltipPortal = ({ tooltip }) => {
     return ReactDOM.createPortal(tooltipElement, document.body);
 };
 
+const HEATMAP_FIRST_YEAR = 2025;
+
+// Adherence is calories as a percentage of the daily goal
+const heatmapLevel = (calories, adherence) => {
+    if (!calories) return 0;
+    if (adherence < 50) return 1;
+    if (adherence < 90) return 2;
+    if (adherence <= 110) return 3;
+    return 4;
+};
+
 const CalendarHistory = React.memo(() => {
     const [weekOptions, setWeekOptions] = useState([]);
     const [weekStart, setWeekStart] = useState(null);
@@ -56,6 +68,8 @@ const CalendarHistory = React.memo(() => {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState(null);
     const [activeTooltip, setActiveTooltip] = useState(null);
+    const [heatmapYear, setHeatmapYear] = useState(new Date().getFullYear());
+    const [heatmap, setHeatmap] = useState(null);
 
     const getAuthHeaders = useCallback(() => {
         const token = localStorage.getItem('authToken');
@@ -130,6 +144,51 @@ const CalendarHistory = React.memo(() => {
         }
     }, [getAuthHeaders]);
 
+    // The whole year comes back as one small array-encoded payload instead of 52 week requests
+    const fetchHeatmap = useCallback(async (year) => {
+        try {
+            const res = await fetch(apiEndpoints.getCalendarHeatmap(year), {
+                headers: getAuthHeaders()
+            });
+            if (!res.ok) throw new Error('Failed to fetch year overview');
+            setHeatmap(await res.json());
+        } catch (err) {
+            setError('Failed to load year overview. Please try again.');
+            console.error('Error fetching heatmap:', err);
+        }
+    }, [getAuthHeaders]);
+
+    useEffect(() => {
+        fetchHeatmap(heatmapYear);
+    }, [heatmapYear, fetchHeatmap]);
+
+    const heatmapDays = useMemo(() => {
+        if (!heatmap) return [];
+        const [year, month, day] = heatmap.start.split('-').map(Number);
+        return heatmap.calories.map((calories, i) => {
+            const date = new Date(Date.UTC(year, month - 1, day + i));
+            return {
+                dateStr: date.toISOString().split('T')[0],
+                weekday: date.getUTCDay(),
+                calories,
+                adherence: heatmap.adherence[i],
+                progress: heatmap.progress[i]
+            };
+        });
+    }, [heatmap]);
+
+    const jumpToWeek = (dateStr) => {
+        const week = weekOptions.find(w => {
+            const end = new Date(w);
+            end.setDate(end.getDate() + 6);
+            return w.toISOString().split('T')[0] <= dateStr && dateStr <= end.toISOString().split('T')[0];
+        });
+        if (week) {
+            setWeekStart(week);
+            setSelectedWeekStartStr(week.toISOString());
+        }
+    };
+
     useEffect(() => {
         if (!weekStart) return;
 
@@ -358,7 +417,10 @@ const CalendarHistory = React.memo(() => {
             <div className="flex-between">
                 <h2>Weekly Nutrition & Progress</h2>
                 <button
-                    onClick={() => fetchWeekData(weekStart)}
+                    onClick={() => {
+                        fetchWeekData(weekStart);
+                        fetchHeatmap(heatmapYear);
+                    }}
                     className="btn-secondary btn-small"
                     disabled={loading}
                 >
@@ -368,6 +430,42 @@ const CalendarHistory = React.memo(() => {
 
             {error && <div className="error">{error}</div>}
 
+            {heatmap && (
+                <div className="year-heatmap mb-20">
+                    <div className="flex-between">
+                        <h3>Year Overview</h3>
+                        <div className="flex gap-10">
+                            <label>Year: </label>
+                            <select
+                                value={heatmapYear}
+                                onChange={(e) => setHeatmapYear(Number(e.target.value))}
+                            >
+                                {Array.from(
+                                    { length: new Date().getFullYear() - HEATMAP_FIRST_YEAR + 1 },
+                                    (_, i) => new Date().getFullYear() - i
+                                ).map(year => (
+                                    <option key={year} value={year}>{year}</option>
+                                ))}
+                            </select>
+                        </div>
+                    </div>
+                    <div className="heatmap-grid">
+                        {heatmapDays.length > 0 && Array.from({ length: heatmapDays[0].weekday }, (_, i) => (
+                            <div key={`pad-${i}`} className="heatmap-cell heatmap-pad" />
+                        ))}
+                        {heatmapDays.map(day => (
+                            <div
+                                key={day.dateStr}
+                                className={`heatmap-cell level-${heatmapLevel(day.calories, day.adherence)}${day.progress ? ' has-progress' : ''}`}
+                                title={`${day.dateStr}: ${day.calories} kcal (${day.adherence}% of goal)${day.progress ? ', workout logged' : ''}`}
+                                onClick={() => jumpToWeek(day.dateStr)}
+                            />
+                        ))}
+                    </div>
+                    <p className="heatmap-legend">Daily goal: {heatmap.goal} kcal. Click a day to open its week.</p>
+                </div>
+            )}
+
             <div className="week-selector">
                 <button
                     onClick={() => navigateWeek(-1)}
@@ -1,5 +1,6 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { PieChart, Pie, Cell, Tooltip, Legend, ResponsiveContainer } from 'recharts';
+import { applySyncDelta, fetchSyncCursor, fetchSyncDelta } from './apiUtils';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
@@ -19,6 +20,8 @@ const CalorieTracker = React.memo(() => {
     const [success, setSuccess] = useState(null);
     const [lookupLoading, setLookupLoading] = useState(false);
     const [deleteEntryId, setDeleteEntryId] = useState(null);
+    const [suggestions, setSuggestions] = useState([]);
+    const syncCursor = useRef(null);
 
     const getAuthHeaders = useCallback(() => {
         const token = localStorage.getItem('authToken');
@@ -59,10 +62,69 @@ const CalorieTracker = React.memo(() => {
         }
     }, [getAuthHeaders]);
 
+    // Pull only what changed since the last sync; fall back to a full reload without a cursor
+    const syncEntries = useCallback(async () => {
+        if (syncCursor.current === null) {
+            await fetchEntries();
+            return;
+        }
+
+        try {
+            const delta = await fetchSyncDelta(syncCursor.current, getAuthHeaders());
+            if (delta.full) {
+                syncCursor.current = delta.cursor;
+                await fetchEntries();
+                return;
+            }
+            // New entries are always stamped with the server's current date, so they belong to today
+            setEntries(prev => applySyncDelta(prev, delta.entries, delta.deleted.entries, (a, b) => b.id - a.id));
+            if (delta.goals) setGoals(delta.goals);
+            syncCursor.current = delta.cursor;
+        } catch (err) {
+            console.error('Error syncing entries:', err);
+            await fetchEntries();
+        }
+    }, [fetchEntries, getAuthHeaders]);
+
     useEffect(() => {
-        fetchEntries();
+        const loadInitial = async () => {
+            // Take the cursor before the snapshot so nothing written in between is missed
+            syncCursor.current = await fetchSyncCursor(getAuthHeaders());
+            await fetchEntries();
+        };
+        loadInitial();
         fetchGoals();
-    }, [fetchEntries, fetchGoals]);
+    }, [fetchEntries, fetchGoals, getAuthHeaders]);
+
+    useEffect(() => {
+        const term = query.trim();
+        if (term.length < 2 || lookupData) {
+            setSuggestions([]);
+            return;
+        }
+
+        const controller = new AbortController();
+        const timer = setTimeout(async () => {
+            try {
+                const res = await fetch(
+                    `${API_BASE_URL}/foods/search?q=${encodeURIComponent(term)}&limit=8`,
+                    { headers: getAuthHeaders(), signal: controller.signal }
+                );
+                if (!res.ok) return;
+                const data = await res.json();
+                setSuggestions(data.results || []);
+            } catch (err) {
+                if (err.name !== 'AbortError') {
+                    console.error('Error searching foods:', err);
+                }
+            }
+        }, 150);
+
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [query, lookupData, getAuthHeaders]);
 
     useEffect(() => {
         if (success) {
@@ -78,10 +140,7 @@ const CalorieTracker = React.memo(() => {
         }
     }, [error]);
 
-    const handleLookup = async (e) => {
-        e.preventDefault();
-        if (!query.trim()) return;
-
+    const lookupNutrition = async (foodQuery) => {
         try {
             setLookupLoading(true);
             setError(null);
@@ -89,7 +148,7 @@ const CalorieTracker = React.memo(() => {
             const res = await fetch(`${API_BASE_URL}/api/nutritionix`, {
                 method: 'POST',
                 headers: getAuthHeaders(),
-                body: JSON.stringify({ query: query.trim() })
+                body: JSON.stringify({ query: foodQuery })
             });
 
             const data = await res.json();
@@ -111,6 +170,19 @@ const CalorieTracker = React.memo(() => {
         }
     };
 
+    const handleLookup = async (e) => {
+        e.preventDefault();
+        if (!query.trim()) return;
+        await lookupNutrition(query.trim());
+    };
+
+    // Suggestions come from the per-unit cache, so look the suggested serving up like a typed query
+    const handleSelectSuggestion = async (food) => {
+        setQuery(food.lookup_query);
+        setSuggestions([]);
+        await lookupNutrition(food.lookup_query);
+    };
+
     const handleAddFood = async () => {
         if (!lookupData || lookupData.error) return;
 
@@ -134,7 +206,7 @@ const CalorieTracker = React.memo(() => {
                 throw new Error(responseData.error || 'Failed to add food entry');
             }
 
-            await fetchEntries();
+            await syncEntries();
             setLookupData(null);
             setQuery('');
             setSuccess('Food added successfully!');
@@ -158,7 +230,7 @@ const CalorieTracker = React.memo(() => {
                 throw new Error(errorData.error || 'Failed to delete entry');
             }
 
-            await fetchEntries();
+            await syncEntries();
             setSuccess('Entry deleted successfully!');
         } catch (err) {
             setError(err.message || 'Failed to delete entry');
@@ -225,10 +297,31 @@ const CalorieTracker = React.memo(() => {
                             type="text"
                             placeholder="Enter food item (e.g., 1 cup of rice, 6 oz chicken breast)"
                             value={query}
-                            onChange={(e) => setQuery(e.target.value)}
+                            onChange={(e) => {
+                                setQuery(e.target.value);
+                                setLookupData(null);
+                            }}
                             disabled={lookupLoading}
+                            autoComplete="off"
                             required
                         />
+                        {suggestions.length > 0 && (
+                            <ul className="food-suggestions">
+                                {suggestions.map(food => (
+                                    <li key={food.query}>
+                                        <button
+                                            type="button"
+                                            onClick={() => handleSelectSuggestion(food)}
+                                        >
+                                            <span>{food.lookup_query}</span>
+                                            <span className="goal-text">
+                                                {food.calories.toFixed(0)} kcal
+                                            </span>
+                                        </button>
+                                    </li>
+                                ))}
+                            </ul>
+                        )}
                     </div>
                     <button
                         type="submit"
@@ -1,8 +1,9 @@
-import React, { useEffect, useState, useCallback, useMemo } from 'react';
+import React, { useEffect, useState, useCallback, useMemo, useRef } from 'react';
 import {
     LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer,
     BarChart, Bar, ReferenceLine
 } from 'recharts';
+import { applySyncDelta, fetchSyncCursor, fetchSyncDelta } from './apiUtils';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
@@ -21,6 +22,7 @@ const ProgressTracker = React.memo(() => {
     const [success, setSuccess] = useState(null);
     const [chartView, setChartView] = useState('line');
     const [timeRange, setTimeRange] = useState('all');
+    const syncCursor = useRef(null);
 
     const getAuthHeaders = useCallback(() => {
         const token = localStorage.getItem('authToken');
@@ -56,6 +58,30 @@ const ProgressTracker = React.memo(() => {
         }
     }, [getAuthHeaders]);
 
+    const syncProgressEntries = useCallback(async () => {
+        if (syncCursor.current === null) {
+            await fetchProgressEntries();
+            return;
+        }
+
+        try {
+            const delta = await fetchSyncDelta(syncCursor.current, getAuthHeaders());
+            if (delta.full) {
+                syncCursor.current = delta.cursor;
+                await fetchProgressEntries();
+                return;
+            }
+            setProgressEntries(prev => applySyncDelta(
+                prev, delta.progress, delta.deleted.progress,
+                (a, b) => a.date.localeCompare(b.date) || a.id - b.id
+            ));
+            syncCursor.current = delta.cursor;
+        } catch (err) {
+            console.error('Error syncing progress:', err);
+            await fetchProgressEntries();
+        }
+    }, [fetchProgressEntries, getAuthHeaders]);
+
     const handleSubmit = async (e) => {
         e.preventDefault();
 
@@ -86,7 +112,7 @@ const ProgressTracker = React.memo(() => {
             }
 
             setFormData({ person_weight: '', bench: '', squat: '', dead_lift: '' });
-            await fetchProgressEntries();
+            await syncProgressEntries();
             setSuccess('Progress entry added successfully!');
         } catch (err) {
             setError(err.message || 'Failed to add progress entry');
@@ -108,7 +134,7 @@ const ProgressTracker = React.memo(() => {
                 throw new Error(errorData.error || 'Failed to delete entry');
             }
 
-            await fetchProgressEntries();
+            await syncProgressEntries();
             setSuccess('Progress entry deleted successfully!');
         } catch (err) {
             setError(err.message || 'Failed to delete entry');
@@ -119,8 +145,12 @@ const ProgressTracker = React.memo(() => {
     };
 
     useEffect(() => {
-        fetchProgressEntries();
-    }, [fetchProgressEntries]);
+        const loadInitial = async () => {
+            syncCursor.current = await fetchSyncCursor(getAuthHeaders());
+            await fetchProgressEntries();
+        };
+        loadInitial();
+    }, [fetchProgressEntries, getAuthHeaders]);
 
     useEffect(() => {
         if (success) {
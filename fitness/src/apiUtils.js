@@ -45,8 +45,14 @@ export const apiEndpoints = {
     updateGoals: () => `${API_BASE_URL}/goals`,
 
     getSummaryStats: (days = 7) => `${API_BASE_URL}/stats/summary?days=${days}`,
+    getCalendarHeatmap: (year) => `${API_BASE_URL}/calendar/heatmap?year=${year}`,
+
+    syncCursor: () => `${API_BASE_URL}/sync/cursor`,
+    syncChanges: (since) => `${API_BASE_URL}/sync?since=${since}`,
 
     nutritionLookup: () => `${API_BASE_URL}/api/nutritionix`,
+    searchFoods: (query, limit = 8) =>
+        `${API_BASE_URL}/foods/search?q=${encodeURIComponent(query)}&limit=${limit}`,
 
     login: () => `${API_BASE_URL}/auth/login`,
     register: () => `${API_BASE_URL}/auth/register`,
@@ -54,6 +60,48 @@ export const apiEndpoints = {
     profile: () => `${API_BASE_URL}/auth/profile`
 };
 
+// Merge a /sync delta into a list: drop tombstoned ids, replace or add upserted rows
+export const applySyncDelta = (items, upserted, deletedIds, compare) => {
+    const deleted = new Set(deletedIds);
+    const changed = new Set(upserted.map(item => item.id));
+    const kept = items.filter(item => !deleted.has(item.id) && !changed.has(item.id));
+    return [...kept, ...upserted].sort(compare);
+};
+
+export const fetchSyncDelta = async (since, headers) => {
+    const delta = { entries: [], progress: [], goals: null, deleted: { entries: [], progress: [] } };
+    let cursor = since;
+    let hasMore = true;
+
+    while (hasMore) {
+        const res = await fetch(apiEndpoints.syncChanges(cursor), { headers });
+        if (!res.ok) throw new Error('Failed to sync changes');
+        const data = await res.json();
+        // The server answers with a full snapshot when the cursor predates its change-log retention
+        if (data.full) return data;
+        delta.entries.push(...data.entries);
+        delta.progress.push(...data.progress);
+        delta.deleted.entries.push(...data.deleted.entries);
+        delta.deleted.progress.push(...data.deleted.progress);
+        delta.goals = data.goals || delta.goals;
+        cursor = data.cursor;
+        hasMore = data.has_more;
+    }
+
+    return { ...delta, cursor };
+};
+
+export const fetchSyncCursor = async (headers) => {
+    try {
+        const res = await fetch(apiEndpoints.syncCursor(), { headers });
+        if (!res.ok) return null;
+        const data = await res.json();
+        return data.cursor;
+    } catch (err) {
+        return null;
+    }
+};
+
 import { useAuth } from './AuthContext';
 import { useCallback } from 'react';
 
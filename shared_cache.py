@@ -0,0 +1,288 @@
+"""Small key/value cache shared by the nutrition lookup and stats paths.
+
+Backends are picked by URL:
+    memory://                 per-process dictionary (default)
+    sqlite:///cache.db        file shared by every worker on one host
+    redis://[:password@]host:port/db
+                              any server speaking the Redis protocol
+
+Values must be JSON serialisable. Backends never raise on a cache failure;
+a broken cache behaves like an empty one.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    # Whether every worker process sees the same entries
+    shared = False
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class InProcessCache(CacheBackend):
+    """LRU dictionary local to one process."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _PerThreadConnection:
+    """Lazily opened connection per thread, reopened after a fork."""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def reset(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class SQLiteCache(CacheBackend):
+    """Cache table in its own SQLite file, in WAL mode so readers never wait on writers."""
+
+    PURGE_EVERY = 1000
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = _PerThreadConnection(self._connect)
+        self._writes = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._conn.get().execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache get failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        try:
+            conn = self._conn.get()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache set failed: {e}")
+
+    def delete(self, key):
+        try:
+            self._conn.get().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache delete failed: {e}")
+
+    def clear(self):
+        try:
+            self._conn.get().execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache clear failed: {e}")
+
+
+class RedisProtocolError(Exception):
+    pass
+
+
+class _RespConnection:
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+
+    def command(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+        return read_resp(self.reader)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def read_resp(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b'+':
+        return payload.decode()
+    if prefix == b'-':
+        raise RedisProtocolError(payload.decode())
+    if prefix == b':':
+        return int(payload)
+    if prefix == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if prefix == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_resp(reader) for _ in range(length)]
+    raise RedisProtocolError(f"Unexpected reply: {line!r}")
+
+
+class RedisCache(CacheBackend):
+    """Minimal client for the Redis protocol (GET/SET/DEL), one connection per thread."""
+
+    RETRY_AFTER = 5
+    shared = True
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=0.5, prefix='fitnessify:'):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.prefix = prefix
+        self._conn = _PerThreadConnection(self._connect)
+        self._down_until = 0
+
+    def _connect(self):
+        conn = _RespConnection(self.host, self.port, self.timeout)
+        if self.password:
+            conn.command('AUTH', self.password)
+        if self.db:
+            conn.command('SELECT', self.db)
+        return conn
+
+    def _command(self, *args):
+        # After a failure, behave like an empty cache for a while instead of paying a timeout per request
+        if self._down_until > time.monotonic():
+            return None
+        try:
+            return self._conn.get().command(*args)
+        except (OSError, ConnectionError, RedisProtocolError) as e:
+            logger.warning(f"Redis cache command {args[0]} failed: {e}")
+            self._conn.reset()
+            self._down_until = time.monotonic() + self.RETRY_AFTER
+            return None
+
+    def get(self, key):
+        data = self._command('GET', self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key, value, ttl=None):
+        args = ['SET', self.prefix + key, json.dumps(value)]
+        if ttl:
+            args += ['PX', int(ttl * 1000)]
+        self._command(*args)
+
+    def delete(self, key):
+        self._command('DEL', self.prefix + key)
+
+    def clear(self):
+        # Only our own keys: FLUSHDB would also wipe other applications sharing the database
+        cursor = b'0'
+        while True:
+            reply = self._command('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 500)
+            if reply is None:
+                return
+            cursor, keys = reply
+            if keys:
+                self._command('DEL', *keys)
+            if cursor == b'0':
+                return
+
+
+def make_cache(url):
+    parsed = urlparse(url or 'memory://')
+    if parsed.scheme == 'memory':
+        return InProcessCache()
+    if parsed.scheme == 'sqlite':
+        # Same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        return SQLiteCache(parsed.path[1:] or ':memory:')
+    if parsed.scheme == 'redis':
+        return RedisCache(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip('/') or 0),
+            password=parsed.password
+        )
+    raise ValueError(f"Unsupported cache URL: {url}")
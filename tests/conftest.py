@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Buckets are module-level; give every test its own so user ids can repeat
+    monkeypatch.setitem(app_module._rate_limiters, 'memory', app_module.TokenBucketLimiter())
+    flask_app = app_module.create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'JWT_SECRET_KEY': 'test-secret-key-with-enough-length',
+        'NUTRITIONIX_APP_ID': None,
+        'NUTRITION_CACHE_EVICT_INTERVAL': 0,
+        'ARCHIVE_DIR': str(tmp_path / 'archive'),
+    })
+    with flask_app.app_context():
+        app_module.init_db()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post('/auth/register', json={
+        'username': 'tester', 'email': 'tester@example.com', 'password': 'secret1'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
@@ -0,0 +1,35 @@
+import datetime
+
+from app import CalorieEntry, ProgressEntry, archive_calorie_entries, db
+
+
+def test_empty_year_still_has_goal(client, auth_headers):
+    heatmap = client.get('/calendar/heatmap?year=2001', headers=auth_headers).get_json()
+    assert heatmap['goal'] == 2000
+    assert heatmap['start'] == '2001-01-01'
+    assert len(heatmap['calories']) == 365
+    assert set(heatmap['calories']) == {0}
+
+
+def test_invalid_year(client, auth_headers):
+    assert client.get('/calendar/heatmap?year=abc', headers=auth_headers).status_code == 400
+    assert client.get('/calendar/heatmap?year=1800', headers=auth_headers).status_code == 400
+
+
+def test_live_archived_and_progress_days(app, client, auth_headers):
+    today = datetime.date.today()
+    old = today - datetime.timedelta(days=200)
+    with app.app_context():
+        for date, calories in ((old, 500.0), (old, 500.0), (today, 3000.0)):
+            db.session.add(CalorieEntry(user_id=1, name='food', calories=calories, protein=0, carbs=0,
+                                        fat=0, date=date))
+        db.session.add(ProgressEntry(user_id=1, person_weight=180, bench=200, squat=250, dead_lift=300,
+                                     date=today))
+        db.session.commit()
+        archive_calorie_entries()
+
+    for date, calories, adherence, progress in ((old, 1000, 50, 0), (today, 3000, 150, 1)):
+        heatmap = client.get(f'/calendar/heatmap?year={date.year}', headers=auth_headers).get_json()
+        i = (date - datetime.date(date.year, 1, 1)).days
+        assert (heatmap['calories'][i], heatmap['adherence'][i], heatmap['progress'][i]) == \
+            (calories, adherence, progress)
@@ -0,0 +1,133 @@
+import datetime
+import threading
+
+import pytest
+
+import entry_archive
+from app import CalorieEntry, DailyNutritionSummary, archive_calorie_entries, db
+
+
+def make_row(entry_id, date='2024-03-05', calories=100.0):
+    return {'id': entry_id, 'name': f'food {entry_id}', 'calories': calories, 'protein': 1.0,
+            'carbs': 2.0, 'fat': 3.0, 'date': date, 'created_at': f'{date}T08:00:{entry_id % 60:02d}'}
+
+
+def test_write_month_merges_by_id(tmp_path):
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(1), make_row(2)])
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(2, calories=250.0), make_row(3)])
+
+    rows = entry_archive.read_month(tmp_path, 1, '2024-03')
+    assert [row['id'] for row in rows] == [1, 2, 3]
+    assert rows[1]['calories'] == 250.0
+    assert entry_archive.archived_months(tmp_path, 1) == ['2024-03']
+    assert entry_archive.read_month(tmp_path, 2, '2024-03') == []
+
+
+def test_read_range_filters_by_date(tmp_path):
+    entry_archive.write_month(tmp_path, 1, '2024-02', [make_row(1, '2024-02-28')])
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(2, '2024-03-01'), make_row(3, '2024-03-20')])
+
+    rows = entry_archive.read_range(tmp_path, 1, datetime.date(2024, 2, 28), datetime.date(2024, 3, 10))
+    assert [row['id'] for row in rows] == [1, 2]
+    assert len(entry_archive.read_range(tmp_path, 1)) == 3
+
+
+def test_remove_entry(tmp_path):
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(1), make_row(2)])
+
+    assert entry_archive.remove_entry(tmp_path, 1, 2)['id'] == 2
+    assert entry_archive.remove_entry(tmp_path, 1, 2) is None
+    assert [row['id'] for row in entry_archive.read_month(tmp_path, 1, '2024-03')] == [1]
+
+
+def test_remove_entry_keeps_file_when_callback_fails(tmp_path):
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(1)])
+
+    def fail(row):
+        raise RuntimeError("commit failed")
+
+    with pytest.raises(RuntimeError):
+        entry_archive.remove_entry(tmp_path, 1, 1, on_remove=fail)
+    assert [row['id'] for row in entry_archive.read_month(tmp_path, 1, '2024-03')] == [1]
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(i) for i in range(100, 120)])
+
+    def archive(first):
+        for entry_id in range(first, first + 10):
+            entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(entry_id)])
+
+    def delete(entry_id):
+        entry_archive.remove_entry(tmp_path, 1, entry_id)
+
+    threads = [threading.Thread(target=archive, args=(first,)) for first in (1, 11, 21, 31)]
+    threads += [threading.Thread(target=delete, args=(entry_id,)) for entry_id in range(100, 120)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(row['id'] for row in entry_archive.read_month(tmp_path, 1, '2024-03')) == list(range(1, 41))
+
+
+def test_max_archived_id(tmp_path):
+    assert entry_archive.max_archived_id(tmp_path) == 0
+    entry_archive.write_month(tmp_path, 1, '2024-03', [make_row(7)])
+    entry_archive.write_month(tmp_path, 2, '2024-01', [make_row(42, '2024-01-02')])
+    assert entry_archive.max_archived_id(tmp_path) == 42
+
+
+def add_entries(app, dates, user_id=1):
+    with app.app_context():
+        for i, date in enumerate(dates):
+            db.session.add(CalorieEntry(user_id=user_id, name=f'food {i}', calories=100.0 + i,
+                                        protein=1.0, carbs=2.0, fat=3.0, date=date))
+        db.session.commit()
+
+
+def test_archive_round_trip(app, client, auth_headers):
+    old = datetime.date.today() - datetime.timedelta(days=200)
+    add_entries(app, [old, old, datetime.date.today()])
+    before = client.get('/entries', headers=auth_headers).get_json()
+
+    with app.app_context():
+        assert archive_calorie_entries() == 2
+        assert archive_calorie_entries() == 0
+        summary = DailyNutritionSummary.query.one()
+        assert (summary.date, summary.calories, summary.entry_count) == (old, 201.0, 2)
+        assert CalorieEntry.query.count() == 1
+
+    assert client.get('/entries', headers=auth_headers).get_json() == before
+    stats = client.get('/stats/summary?days=365', headers=auth_headers).get_json()
+    assert stats['entries_count'] == 3
+
+
+def test_archived_ids_are_not_reused(app, client, auth_headers):
+    old = datetime.date.today() - datetime.timedelta(days=200)
+    add_entries(app, [old, old])
+    with app.app_context():
+        archive_calorie_entries()
+
+    response = client.post('/entries', json={'name': 'new', 'calories': 10, 'protein': 0, 'carbs': 0, 'fat': 0},
+                           headers=auth_headers)
+    assert response.get_json()['entry']['id'] == 3
+    assert len(client.get('/entries', headers=auth_headers).get_json()) == 3
+
+
+def test_delete_archived_entry(app, client, auth_headers):
+    old = datetime.date.today() - datetime.timedelta(days=200)
+    add_entries(app, [old, old])
+    with app.app_context():
+        archive_calorie_entries()
+
+    assert client.delete('/entries/1', headers=auth_headers).status_code == 200
+    assert client.delete('/entries/1', headers=auth_headers).status_code == 404
+    assert [entry['id'] for entry in client.get('/entries', headers=auth_headers).get_json()] == [2]
+    with app.app_context():
+        summary = DailyNutritionSummary.query.one()
+        assert (summary.calories, summary.entry_count) == (101.0, 1)
+
+    client.delete('/entries/2', headers=auth_headers)
+    with app.app_context():
+        assert DailyNutritionSummary.query.count() == 0
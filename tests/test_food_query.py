@@ -0,0 +1,117 @@
+import pytest
+
+from app import ParsedQuery, nutrition_cache_key, parse_food_query, per_unit_nutrition, scale_nutrition
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('2 eggs', (2.0, None, 'egg')),
+    ('two eggs', (2.0, None, 'egg')),
+    ('2  Eggs', (2.0, None, 'egg')),
+    ('egg x2', (2.0, None, 'egg')),
+    ('egg 2x', (2.0, None, 'egg')),
+    ('2x eggs', (2.0, None, 'egg')),
+    ('two dozen eggs', (24.0, None, 'egg')),
+    ('100g chicken breast', (100.0, 'g', 'chicken breast')),
+    ('100 grams of chicken breast', (100.0, 'g', 'chicken breast')),
+    ('6 oz chicken breast', (6.0, 'oz', 'chicken breast')),
+    ('1.5l water', (1.5, 'l', 'water')),
+    ('1 1/2 cups rice', (1.5, 'cup', 'rice')),
+    ('half a cup of oats', (0.5, 'cup', 'oat')),
+    ('1,5 cups rice', (1.5, 'cup', 'rice')),
+    ('1,000 g rice', (1000.0, 'g', 'rice')),
+    ('1 5 cups rice', (1.0, None, '5 cup rice')),
+    ('Crème brûlée', (1.0, None, 'creme brulee')),
+])
+def test_parse_food_query(query, expected):
+    assert parse_food_query(query) == ParsedQuery(*expected)
+
+
+@pytest.mark.parametrize('query, food', [
+    ('2% milk', '2% milk'),
+    ('7up', '7up'),
+    ('v8 juice', 'v8 juice'),
+])
+def test_numbers_inside_food_names_are_not_quantities(query, food):
+    assert parse_food_query(query) == ParsedQuery(1.0, None, food)
+
+
+@pytest.mark.parametrize('query, food', [
+    ('cookies', 'cookie'),
+    ('pies', 'pie'),
+    ('molasses', 'molasses'),
+    ('hummus', 'hummus'),
+    ('berries', 'berry'),
+    ('potatoes', 'potato'),
+    ('peaches', 'peach'),
+])
+def test_singular_food_names(query, food):
+    assert parse_food_query(query).food == food
+
+
+@pytest.mark.parametrize('query', ['0 eggs', 'egg x0', '0 g rice'])
+def test_zero_quantity_is_rejected(query):
+    with pytest.raises(ValueError):
+        parse_food_query(query)
+
+
+def test_cache_key_ignores_quantity():
+    assert nutrition_cache_key(parse_food_query('2 eggs')) == nutrition_cache_key(parse_food_query('egg x3'))
+    assert nutrition_cache_key(parse_food_query('100g rice')) == 'g rice'
+
+
+def test_scale_nutrition_round_trips_per_unit_values():
+    result = {'food_name': 'rice', 'calories': 205.0, 'protein': 4.3, 'carbs': 44.5, 'fat': 0.4,
+              'serving_qty': 158.0, 'serving_unit': 'g'}
+    per_unit = per_unit_nutrition(result, ParsedQuery(158.0, 'g', 'rice'))
+    assert per_unit['serving_qty'] == 1.0
+    assert per_unit['calories'] == pytest.approx(205.0 / 158.0, abs=1e-6)
+
+    scaled = scale_nutrition(per_unit, 158.0)
+    for field in ('calories', 'protein', 'carbs', 'fat', 'serving_qty'):
+        assert scaled[field] == pytest.approx(result[field], abs=0.01)
+    assert scaled['food_name'] == 'rice'
+
+
+def test_per_unit_skips_servings_that_disagree_with_the_parser():
+    burger = {'food_name': 'burger', 'calories': 840.0, 'protein': 39.0, 'carbs': 39.0, 'fat': 55.0,
+              'serving_qty': 1, 'serving_unit': 'burger'}
+    assert per_unit_nutrition(burger, parse_food_query('5 guys burger')) is None
+
+    grams = dict(burger, serving_qty=100, serving_unit='g')
+    assert per_unit_nutrition(grams, ParsedQuery(100.0, 'cup', 'rice')) is None
+    assert per_unit_nutrition(dict(grams, serving_unit='grams'), ParsedQuery(100.0, 'g', 'rice')) is not None
+    assert per_unit_nutrition(dict(grams, serving_qty=0), ParsedQuery(1.0, None, 'rice')) is None
+
+
+def test_lookup_caches_one_unit_and_scales_hits(client, auth_headers):
+    first = client.post('/api/nutritionix', json={'query': '100g chicken breast'}, headers=auth_headers)
+    assert first.get_json()['calories'] == 150.0
+
+    second = client.post('/api/nutritionix', json={'query': '200 grams chicken breast'}, headers=auth_headers)
+    assert second.get_json()['calories'] == pytest.approx(300.0)
+    assert second.get_json()['serving_qty'] == pytest.approx(200.0)
+
+
+def test_percent_food_does_not_pollute_plain_row(client, auth_headers):
+    client.post('/api/nutritionix', json={'query': '2% milk'}, headers=auth_headers)
+    milk = client.post('/api/nutritionix', json={'query': 'milk'}, headers=auth_headers)
+    assert milk.get_json()['calories'] == 150.0
+    assert milk.get_json()['food_name'] == 'Mock milk'
+
+
+def test_zero_quantity_lookup_is_a_bad_request(client, auth_headers):
+    response = client.post('/api/nutritionix', json={'query': '0 eggs'}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_search_suggests_default_servings(client, auth_headers):
+    client.post('/api/nutritionix', json={'query': '100g chicken breast'}, headers=auth_headers)
+    client.post('/api/nutritionix', json={'query': '3 eggs'}, headers=auth_headers)
+
+    chicken, = client.get('/foods/search?q=chick', headers=auth_headers).get_json()['results']
+    assert chicken['lookup_query'] == '100 g chicken breast'
+    assert chicken['calories'] == pytest.approx(150.0)
+
+    egg, = client.get('/foods/search?q=egg', headers=auth_headers).get_json()['results']
+    assert egg['lookup_query'] == '1 egg'
+    assert egg['calories'] == pytest.approx(50.0)
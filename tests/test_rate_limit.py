@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+import app as app_module
+from app import DatabaseTokenBucketLimiter, TokenBucketLimiter, create_app, parse_rate_limit
+
+
+@pytest.mark.parametrize('limit, expected', [
+    ('30/minute', (30.0, 0.5)),
+    ('2/second', (2.0, 2.0)),
+    ('100 / hours', (100.0, 100 / 3600)),
+])
+def test_parse_rate_limit(limit, expected):
+    assert parse_rate_limit(limit) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('limit', ['5 per minute', 'x/minute', '0/minute', '5/fortnight'])
+def test_malformed_limits_fail_at_startup(limit):
+    with pytest.raises(ValueError):
+        create_app({'RATE_LIMITS': {'nutritionix': limit}})
+
+
+def test_unknown_storage_fails_at_startup():
+    with pytest.raises(ValueError):
+        create_app({'RATE_LIMIT_STORAGE': 'redis'})
+
+
+@pytest.fixture(params=['memory', 'database'])
+def limiter(request, app):
+    if request.param == 'memory':
+        yield TokenBucketLimiter()
+        return
+    with app.app_context():
+        yield DatabaseTokenBucketLimiter()
+
+
+def test_burst_then_refill(limiter):
+    assert [limiter.consume('user', 2, 1.0, now=100.0) for _ in range(2)] == [0, 0]
+    assert limiter.consume('user', 2, 1.0, now=100.0) == pytest.approx(1.0)
+    assert limiter.consume('user', 2, 1.0, now=100.5) == pytest.approx(0.5)
+    assert limiter.consume('user', 2, 1.0, now=101.0) == 0
+    assert limiter.consume('other', 2, 1.0, now=101.0) == 0
+
+
+def test_memory_limiter_prunes_full_buckets():
+    limiter = TokenBucketLimiter()
+    for i in range(100):
+        limiter.consume(f'user{i}', 30, 0.5, now=1000.0)
+    limiter.consume('late', 30, 0.5, now=1000.0 + limiter.PRUNE_INTERVAL + 5)
+    assert list(limiter._buckets) == ['late']
+
+
+def test_memory_limiter_overhead():
+    # Runs on every cache miss before the upstream call; keep it far below request latency
+    limiter = TokenBucketLimiter()
+    checks = 20000
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.consume(f'user{i % 500}', 30, 0.5)
+    per_check_us = (time.perf_counter() - start) / checks * 1_000_000
+    assert per_check_us < 50
+
+
+def test_database_limiter_overhead(app):
+    with app.app_context():
+        limiter = DatabaseTokenBucketLimiter()
+        checks = 200
+        start = time.perf_counter()
+        for i in range(checks):
+            limiter.consume(f'user{i % 50}', 30, 0.5)
+        per_check_ms = (time.perf_counter() - start) / checks * 1000
+    assert per_check_ms < 50
+
+
+@pytest.fixture(params=['memory', 'database'])
+def limited_app(request, app):
+    app.config['RATE_LIMIT_STORAGE'] = request.param
+    app.extensions['rate_limits'] = app_module.parse_rate_limits(
+        dict(app.config, RATE_LIMITS={'nutritionix': '2/minute'})
+    )
+    return app
+
+
+def test_lookups_are_limited_with_retry_after(limited_app, auth_headers):
+    client = limited_app.test_client()
+    for food in ('apple', 'banana'):
+        assert client.post('/api/nutritionix', json={'query': food}, headers=auth_headers).status_code == 200
+
+    response = client.post('/api/nutritionix', json={'query': 'cherry'}, headers=auth_headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+
+    # Cache hits never reach Nutritionix, so they are not limited
+    assert client.post('/api/nutritionix', json={'query': '2 apples'}, headers=auth_headers).status_code == 200
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+from cache_bench import FakeRedisServer
+from shared_cache import InProcessCache, RedisCache, SQLiteCache, make_cache
+
+
+@pytest.fixture
+def fake_redis():
+    server = FakeRedisServer().start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return make_cache('memory://')
+    if request.param == 'sqlite':
+        return make_cache(f"sqlite:///{tmp_path / 'cache.db'}")
+    return make_cache(request.getfixturevalue('fake_redis').url)
+
+
+def test_get_missing_key(cache):
+    assert cache.get('nutrition:egg') is None
+
+
+def test_set_and_get(cache):
+    value = {'calories': 72.0, 'serving_unit': 'large', 'tags': ['breakfast']}
+    cache.set('nutrition:egg', value)
+    assert cache.get('nutrition:egg') == value
+
+
+def test_set_overwrites(cache):
+    cache.set('stats-gen:1', 1)
+    cache.set('stats-gen:1', 2)
+    assert cache.get('stats-gen:1') == 2
+
+
+def test_ttl_expiry(cache):
+    cache.set('short', 'value', ttl=0.05)
+    cache.set('long', 'value', ttl=60)
+    assert cache.get('short') == 'value'
+    time.sleep(0.1)
+    assert cache.get('short') is None
+    assert cache.get('long') == 'value'
+
+
+def test_delete(cache):
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.delete('a')
+    cache.delete('missing')
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+
+
+def test_clear(cache):
+    cache.set('a', 1)
+    cache.clear()
+    assert cache.get('a') is None
+
+
+def test_in_process_cache_evicts_least_recently_used():
+    cache = InProcessCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_sqlite_failure_behaves_as_empty(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'missing-dir' / 'cache.db'))
+    cache.set('a', 1)
+    cache.delete('a')
+    cache.clear()
+    assert cache.get('a') is None
+
+
+def test_redis_failure_behaves_as_empty(fake_redis):
+    host, port = fake_redis.server_address
+    fake_redis.shutdown()
+    fake_redis.server_close()
+
+    cache = RedisCache(host=host, port=port, timeout=0.1)
+    cache.set('a', 1)
+    cache.delete('a')
+    assert cache.get('a') is None
+
+    # Backs off instead of paying a connection attempt on every call
+    start = time.monotonic()
+    for _ in range(100):
+        assert cache.get('a') is None
+    assert time.monotonic() - start < 0.5
+
+
+def test_make_cache_urls(tmp_path):
+    assert isinstance(make_cache('memory://'), InProcessCache)
+    assert isinstance(make_cache(None), InProcessCache)
+    assert isinstance(make_cache(f"sqlite:///{tmp_path / 'cache.db'}"), SQLiteCache)
+
+    redis = make_cache('redis://:secret@cache.internal:6380/2')
+    assert (redis.host, redis.port, redis.db, redis.password) == ('cache.internal', 6380, 2, 'secret')
+
+    with pytest.raises(ValueError):
+        make_cache('memcached://localhost')
+
+
+def test_only_cross_process_backends_are_shared(tmp_path, fake_redis):
+    assert not make_cache('memory://').shared
+    assert make_cache(f"sqlite:///{tmp_path / 'cache.db'}").shared
+    assert make_cache(fake_redis.url).shared
+
+
+def test_redis_clear_keeps_other_applications_keys(fake_redis):
+    cache = make_cache(fake_redis.url)
+    other = RedisCache(host=fake_redis.server_address[0], port=fake_redis.server_address[1], prefix='other:')
+    cache.set('a', 1)
+    cache.set('b', 2)
+    other.set('a', 'theirs')
+
+    cache.clear()
+    assert cache.get('a') is None and cache.get('b') is None
+    assert other.get('a') == 'theirs'
+    assert list(fake_redis.store) == [b'other:a']
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+from app import ChangeLog, check_database_backend, db, prune_change_log
+
+ENTRY = {'name': 'egg', 'calories': 70, 'protein': 6, 'carbs': 0, 'fat': 5}
+
+
+def add_entry(client, headers, name='egg'):
+    return client.post('/entries', json=dict(ENTRY, name=name), headers=headers).get_json()['entry']['id']
+
+
+def sync(client, headers, since=None, **params):
+    query = '&'.join(f'{key}={value}' for key, value in dict(params, since=since).items() if value is not None)
+    return client.get(f'/sync?{query}', headers=headers)
+
+
+def test_delta_after_cursor(client, auth_headers):
+    cursor = client.get('/sync/cursor', headers=auth_headers).get_json()['cursor']
+    kept = add_entry(client, auth_headers, 'kept')
+    removed = add_entry(client, auth_headers, 'removed')
+    client.delete(f'/entries/{removed}', headers=auth_headers)
+
+    delta = sync(client, auth_headers, cursor).get_json()
+    assert not delta['full']
+    assert [entry['id'] for entry in delta['entries']] == [kept]
+    assert delta['deleted']['entries'] == [removed]
+
+    again = sync(client, auth_headers, delta['cursor']).get_json()
+    assert (again['entries'], again['deleted']['entries'], again['cursor']) == ([], [], delta['cursor'])
+
+
+def test_delta_pages(client, auth_headers):
+    cursor = client.get('/sync/cursor', headers=auth_headers).get_json()['cursor']
+    ids = [add_entry(client, auth_headers, f'food {i}') for i in range(5)]
+
+    seen = []
+    while True:
+        page = sync(client, auth_headers, cursor, limit=2).get_json()
+        seen += [entry['id'] for entry in page['entries']]
+        cursor = page['cursor']
+        if not page['has_more']:
+            break
+    assert sorted(seen) == ids
+
+
+def test_no_cursor_is_a_full_snapshot(client, auth_headers):
+    add_entry(client, auth_headers)
+    snapshot = sync(client, auth_headers).get_json()
+    assert snapshot['full']
+    assert len(snapshot['entries']) == 1
+
+
+def test_cursor_from_another_database_gets_a_full_snapshot(client, auth_headers):
+    add_entry(client, auth_headers)
+    response = sync(client, auth_headers, 99999).get_json()
+    assert response['full']
+    assert response['cursor'] < 99999
+    assert len(response['entries']) == 1
+
+
+def test_pruned_cursor_gets_a_full_snapshot(app, client, auth_headers):
+    cursor = client.get('/sync/cursor', headers=auth_headers).get_json()['cursor']
+    add_entry(client, auth_headers, 'old')
+    add_entry(client, auth_headers, 'new')
+
+    with app.app_context():
+        ChangeLog.query.update({ChangeLog.created_at: datetime.datetime.utcnow() - datetime.timedelta(days=60)})
+        db.session.commit()
+        assert prune_change_log(30) > 0
+        assert ChangeLog.query.count() == 1
+
+    response = sync(client, auth_headers, cursor).get_json()
+    assert response['full']
+    assert len(response['entries']) == 2
+
+
+def test_invalid_cursor(client, auth_headers):
+    assert sync(client, auth_headers, 'abc').status_code == 400
+
+
+def test_unsupported_database_is_rejected():
+    check_database_backend('sqlite:///fitness.db')
+    check_database_backend('postgresql://user@localhost/fitness')
+    with pytest.raises(ValueError):
+        check_database_backend('mysql://user@localhost/fitness')